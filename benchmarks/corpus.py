@@ -0,0 +1,119 @@
+"""
+Synthetic HARO digests and Gmail mailboxes for benchmarks.
+"""
+import base64
+import random
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+_RELEVANT_TOPICS = [
+    ("Ways households can cut their electricity bills this winter",
+     "Looking for energy efficiency experts to share practical tips on reducing electricity "
+     "prices at home, smart meter usage and household budgeting."),
+    ("How small businesses are adopting AI automation",
+     "Seeking founders and consultants on workflow automation, cloud computing and "
+     "digital transformation for small business owners."),
+    ("Personal finance apps that actually help people save",
+     "We want fintech experts to explain expense tracking, digital wallets and "
+     "financial literacy for young professionals."),
+    ("What the solar boom means for utility customers",
+     "Need renewable energy specialists on solar power adoption, battery storage and "
+     "how utilities are changing tariff structures."),
+]
+
+_OTHER_TOPICS = [
+    ("Best hiking trails for beginners",
+     "Looking for outdoor guides to recommend easy hiking trails and gear for first-timers."),
+    ("Wedding planning mistakes to avoid",
+     "Seeking wedding planners to share the most common mistakes couples make."),
+    ("Top online casino bonuses this year",
+     "Looking for sports betting and online casino experts to compare welcome bonuses."),
+    ("How to train a stubborn puppy",
+     "Dog trainers, tell us your best tips for house-training a stubborn puppy."),
+]
+
+_OUTLETS = ["Forbes", "HuffPost", "Business Insider", "The Guardian", "Local News Daily"]
+
+
+def _deadline(now_et: datetime, rng: random.Random) -> str:
+    deadline = now_et + timedelta(hours=rng.uniform(-2, 48))
+    return f"{deadline.strftime('%I:%M %p').lstrip('0')} ET - {deadline.day} {deadline.strftime('%B')}"
+
+
+def generate_digest(n_queries: int, relevant_ratio: float = 0.3,
+                    rng: random.Random | None = None) -> str:
+    """
+    Return a plain-text HARO digest with `n_queries` query blocks, about
+    `relevant_ratio` of them on-niche. Deadlines fall between two hours ago
+    (already expired) and two days from now.
+    """
+    rng = rng or random.Random(0)
+    now_et = datetime.now(ZoneInfo("America/New_York"))
+    lines = [
+        "HARO - Help A Reporter Out",
+        "****************************",
+        "INDEX",
+        "****************************",
+        "",
+    ]
+    for i in range(1, n_queries + 1):
+        pool = _RELEVANT_TOPICS if rng.random() < relevant_ratio else _OTHER_TOPICS
+        title, body = rng.choice(pool)
+        outlet = rng.choice(_OUTLETS)
+        lines += [
+            "-----------------------------------",
+            f"{i}) Summary: {title}",
+            f"Name: Reporter {i} {outlet}",
+            "Category: Business and Finance",
+            f"Email: query-{i}-{rng.randrange(10**6):06d}@helpareporter.net",
+            f"Media Outlet: {outlet}",
+            f"Deadline: {_deadline(now_et, rng)}",
+            "",
+            "Query:",
+            body,
+            "",
+            "Requirements:",
+            "Experts with at least 5 years of experience.",
+            "",
+            "Back to Top",
+        ]
+    return "\n".join(lines)
+
+
+def _encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def build_mailbox(n_digests: int, queries_per_digest: int, fresh_ratio: float = 0.5,
+                  relevant_ratio: float = 0.3, seed: int = 0) -> list[dict]:
+    """
+    Return Gmail API "full" format messages: `n_digests` HARO digests, about
+    `fresh_ratio` of them received in the last few minutes and the rest hours old.
+    """
+    rng = random.Random(seed)
+    now_ms = int(time.time() * 1000)
+    messages = []
+    for i in range(n_digests):
+        fresh = rng.random() < fresh_ratio
+        age_minutes = rng.uniform(1, 10) if fresh else rng.uniform(120, 2880)
+        body = generate_digest(queries_per_digest, relevant_ratio, rng)
+        messages.append({
+            "id": f"msg-{i:05d}",
+            "threadId": f"thread-{i:05d}",
+            "internalDate": str(now_ms - int(age_minutes * 60_000)),
+            "labelIds": ["INBOX", "UNREAD"],
+            "payload": {
+                "mimeType": "multipart/alternative",
+                "headers": [
+                    {"name": "Subject", "value": f"[HARO] Morning Edition #{i}"},
+                    {"name": "From", "value": "HARO <haro@helpareporter.com>"},
+                    {"name": "Message-ID", "value": f"<digest-{i}@helpareporter.com>"},
+                ],
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": _encode(body)}},
+                    {"mimeType": "text/html", "body": {"data": _encode(f"<pre>{body}</pre>")}},
+                ],
+            },
+        })
+    return messages
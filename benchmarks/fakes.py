@@ -0,0 +1,369 @@
+"""
+In-process stand-ins for the Gmail, Groq and Sheets clients.
+
+Each fake implements only the slice of the real client interface this repo
+calls, sleeps for a configurable latency per request and fails a
+configurable fraction of requests, so the pipeline can be measured end to
+end without credentials or network.
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from types import SimpleNamespace
+
+import gspread
+import httpx
+import requests
+from groq import APIConnectionError
+from googleapiclient.errors import HttpError
+
+
+class _Backend:
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _roundtrip(self) -> bool:
+        """
+        Simulate one network round trip. Returns False if it should fail.
+        """
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.failure_rate
+            jitter = self._rng.uniform(0.5, 1.5)
+        if self.latency:
+            time.sleep(self.latency * jitter)
+        return not failed
+
+
+# ---------------------------------------------------------------- Gmail
+
+class _GmailResponse(dict):
+    def __init__(self, status: int):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = "Simulated failure"
+
+
+class _Request:
+    def __init__(self, backend: _Backend, handler):
+        self._backend = backend
+        self._handler = handler
+
+    def execute(self):
+        if not self._backend._roundtrip():
+            raise HttpError(_GmailResponse(503), b'{"error": "simulated"}')
+        return self._handler()
+
+    def _execute_in_batch(self):
+        # Items in a batch share the batch's round trip
+        with self._backend._lock:
+            failed = self._backend._rng.random() < self._backend.failure_rate
+        if failed:
+            raise HttpError(_GmailResponse(429), b'{"error": "simulated"}')
+        return self._handler()
+
+
+class _BatchRequest:
+    def __init__(self, backend: _Backend, callback):
+        self._backend = backend
+        self._callback = callback
+        self._items = []
+
+    def add(self, request, request_id=None, callback=None):
+        self._items.append((request, request_id or str(len(self._items)), callback))
+
+    def execute(self):
+        if not self._backend._roundtrip():
+            raise HttpError(_GmailResponse(503), b'{"error": "simulated"}')
+        for request, request_id, callback in self._items:
+            callback = callback or self._callback
+            try:
+                response = request._execute_in_batch()
+            except HttpError as e:
+                callback(request_id, None, e)
+            else:
+                callback(request_id, response, None)
+
+
+class FakeGmailService(_Backend):
+    """
+    Gmail API stand-in holding a mailbox of messages in API "full" format
+    (see benchmarks.corpus.build_mailbox).
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, messages: list[dict], **kwargs):
+        super().__init__(**kwargs)
+        self.mailbox = {m["id"]: m for m in messages}
+        self.unread = set(self.mailbox)
+        self.sent = []
+        self.history_id = 1000
+
+    # Resource chain: service.users().messages().get(...).execute()
+    def users(self):
+        return self
+
+    def messages(self):
+        return _Messages(self)
+
+    def history(self):
+        return _History(self)
+
+    def getProfile(self, userId):
+        return _Request(self, lambda: {"historyId": str(self.history_id)})
+
+    def new_batch_http_request(self, callback=None):
+        return _BatchRequest(self, callback)
+
+
+def _mime_part(payload: dict):
+    subtype = payload["mimeType"].split("/", 1)[1]
+    if payload.get("parts"):
+        part = MIMEMultipart(subtype)
+        for child in payload["parts"]:
+            part.attach(_mime_part(child))
+    else:
+        text = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8")
+        part = MIMEText(text, subtype, "utf-8")
+    for h in payload.get("headers", []):
+        part[h["name"]] = h["value"]
+    return part
+
+
+def _raw_message(message: dict) -> dict:
+    """
+    A "full" format message in "raw" format: its RFC 822 source, base64url.
+    """
+    raw = base64.urlsafe_b64encode(_mime_part(message["payload"]).as_bytes()).decode("ascii")
+    return {**{k: v for k, v in message.items() if k != "payload"}, "raw": raw}
+
+
+def _sent_headers(message: dict) -> str:
+    source = base64.urlsafe_b64decode(message["raw"]).decode("utf-8", errors="replace")
+    return source.split("\n\n", 1)[0]
+
+
+class _Messages:
+    def __init__(self, service: FakeGmailService):
+        self._service = service
+
+    def list(self, userId, q="", pageToken=None, **kwargs):
+        service = self._service
+
+        def handler():
+            if "rfc822msgid:" in q:
+                wanted = q.split("rfc822msgid:", 1)[1].split()[0]
+                found = [m for m in service.sent if f"<{wanted}>" in _sent_headers(m)]
+                return {"messages": [{"id": m["id"], "threadId": m.get("threadId")} for m in found]}
+            ids = [mid for mid in service.mailbox
+                   if "is:unread" not in q or mid in service.unread]
+            start = int(pageToken or 0)
+            page = ids[start:start + service.PAGE_SIZE]
+            result = {"messages": [{"id": mid, "threadId": service.mailbox[mid]["threadId"]}
+                                   for mid in page]}
+            if start + service.PAGE_SIZE < len(ids):
+                result["nextPageToken"] = str(start + service.PAGE_SIZE)
+            return result
+
+        return _Request(service, handler)
+
+    def get(self, userId, id, format="full", metadataHeaders=None, **kwargs):
+        service = self._service
+
+        def handler():
+            message = service.mailbox[id]
+            if format == "raw":
+                return _raw_message(message)
+            if format != "metadata":
+                return message
+            wanted = {h.lower() for h in metadataHeaders or []}
+            headers = [h for h in message["payload"]["headers"]
+                       if not wanted or h["name"].lower() in wanted]
+            return {**{k: v for k, v in message.items() if k != "payload"},
+                    "payload": {"headers": headers}}
+
+        return _Request(service, handler)
+
+    def modify(self, userId, id, body):
+        service = self._service
+
+        def handler():
+            if "UNREAD" in body.get("removeLabelIds", []):
+                service.unread.discard(id)
+            return {"id": id}
+
+        return _Request(service, handler)
+
+    def send(self, userId, body):
+        service = self._service
+
+        def handler():
+            sent_id = f"sent-{len(service.sent) + 1}"
+            service.sent.append({"id": sent_id, **body})
+            return {"id": sent_id, "threadId": body.get("threadId")}
+
+        return _Request(service, handler)
+
+
+class _History:
+    def __init__(self, service: FakeGmailService):
+        self._service = service
+
+    def list(self, userId, startHistoryId, pageToken=None, **kwargs):
+        service = self._service
+
+        def handler():
+            return {
+                "history": [{"messagesAdded": [{"message": {"id": mid}}]}
+                            for mid in service.mailbox],
+                "historyId": str(service.history_id),
+            }
+
+        return _Request(service, handler)
+
+
+# ---------------------------------------------------------------- Groq
+
+_SIGNATURE_RE = re.compile(r"complete signature:\s*\n\n((?:.+\n?){3})")
+
+
+class _FakeStream:
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self.closed:
+                return
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeGroqClient(_Backend):
+    """
+    Groq client stand-in. Returns a short pitch (or the JSON persona/pitch
+    object when response_format asks for JSON) with token usage figures.
+    Plain pitches ramble on past the signature like real models sometimes
+    do, and are streamed a few words per chunk when stream=True.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens=None, response_format=None, stream=False,
+               **kwargs):
+        if not self._roundtrip():
+            raise APIConnectionError(
+                request=httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+            )
+        prompt = "\n\n".join(m["content"] for m in messages)
+        answer = ("Honestly, the fastest win is to check when you use the most power "
+                  "and shift what you can to cheaper hours.")
+        if response_format:
+            content = json.dumps({
+                "name": "Zahid", "title": "Energy Efficiency Specialist",
+                "company": "printebill.com", "website": "https://printebill.com",
+                "expertise": "Helping households cut utility costs.",
+                "pitch": f"{answer}\n\nZahid\nEnergy Efficiency Specialist\nhttps://printebill.com",
+            })
+        else:
+            signature = _SIGNATURE_RE.search(prompt)
+            content = answer + ("\n\n" + signature.group(1).strip() if signature else "")
+            content += "\n\nP.S. Happy to jump on a quick call if that helps."
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+        if stream:
+            pieces = re.findall(r"\S+\s*", content)
+            chunks = [
+                SimpleNamespace(
+                    choices=[SimpleNamespace(delta=SimpleNamespace(content="".join(pieces[i:i + 3])),
+                                             finish_reason=None)],
+                    x_groq=None,
+                )
+                for i in range(0, len(pieces), 3)
+            ]
+            chunks.append(SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")],
+                x_groq=SimpleNamespace(usage=usage),
+            ))
+            return _FakeStream(chunks)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(role="assistant", content=content),
+                finish_reason="stop",
+            )],
+            usage=usage,
+        )
+
+
+# ---------------------------------------------------------------- Sheets
+
+class FakeWorksheet:
+    title = "Sheet1"
+
+    def __init__(self, backend: _Backend):
+        self._backend = backend
+        self.rows = []
+
+    def _check(self):
+        if not self._backend._roundtrip():
+            response = requests.Response()
+            response.status_code = 503
+            response._content = b'{"error": {"code": 503, "message": "simulated", "status": "UNAVAILABLE"}}'
+            raise gspread.exceptions.APIError(response)
+
+    def row_values(self, row: int) -> list:
+        self._check()
+        return list(self.rows[row - 1]) if len(self.rows) >= row else []
+
+    def update(self, range_name, values, **kwargs):
+        self._check()
+        if range_name.startswith("A1"):
+            self.rows[:1] = values
+        else:
+            self.rows.extend(values)
+
+    def append_rows(self, values, **kwargs):
+        self._check()
+        start = len(self.rows) + 1
+        self.rows.extend(values)
+        return {"updates": {"updatedRange": f"Sheet1!A{start}:F{len(self.rows)}"}}
+
+    def get(self, range_name):
+        self._check()
+        return self.rows[-1:]
+
+
+class FakeSheetsClient(_Backend):
+    """
+    gspread client stand-in with a single in-memory worksheet.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.worksheet = FakeWorksheet(self)
+
+    def open_by_key(self, key):
+        if not self._roundtrip():
+            raise RuntimeError("Simulated Sheets failure")
+        return SimpleNamespace(sheet1=self.worksheet)
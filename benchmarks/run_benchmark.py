@@ -0,0 +1,182 @@
+"""
+End-to-end benchmark of process_haro_once against in-process fakes.
+
+    python -m benchmarks.run_benchmark --digests 20 --queries 40 --groq-latency 0.8
+
+Reports per-stage timing (fetch, parse, generate, send, log) and pitch
+throughput. No credentials or network access are needed.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+
+class StageTimer:
+    """
+    Records the duration of every call to the wrapped stage functions.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._patches = []
+
+    def wrap(self, module, attr: str, stage: str):
+        original = getattr(module, attr)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+
+        setattr(module, attr, timed)
+        self._patches.append((module, attr, original))
+
+    def restore(self):
+        for module, attr, original in reversed(self._patches):
+            setattr(module, attr, original)
+        self._patches = []
+
+    def summary(self) -> dict:
+        report = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            report[stage] = {
+                "calls": len(samples),
+                "total_s": round(sum(samples), 4),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            }
+        return report
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--digests", type=int, default=10, help="HARO digests in the mailbox")
+    parser.add_argument("--queries", type=int, default=40, help="queries per digest")
+    parser.add_argument("--fresh-ratio", type=float, default=0.3, help="share of digests inside the recency window")
+    parser.add_argument("--relevant-ratio", type=float, default=0.3, help="share of on-niche queries")
+    parser.add_argument("--gmail-latency", type=float, default=0.05, help="seconds per Gmail round trip")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="seconds per Groq completion")
+    parser.add_argument("--sheets-latency", type=float, default=0.2, help="seconds per Sheets call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of simulated request failures")
+    parser.add_argument("--workers", type=int, default=None, help="pitch workers (PITCH_WORKERS)")
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    return parser.parse_args(argv)
+
+
+def _prepare_environment(workdir: str, args):
+    # Modules read their configuration at import time, so set it first
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["GMAIL_SYNC_STATE_FILE"] = os.path.join(workdir, "sync_state.json")
+    os.environ["HARO_RUN_REPORT"] = os.path.join(workdir, "run_report.json")
+    os.environ["GROQ_REQUESTS_PER_MINUTE"] = "0"  # no client-side throttling
+    if args.workers:
+        os.environ["PITCH_WORKERS"] = str(args.workers)
+
+
+def run_once(args, seed: int, workdir: str) -> dict:
+    import completion_cache
+    import dedup_index
+    import gmail_client
+    import main
+    import pipeline
+    import pitch_generator
+    import sheets_client
+    import spool
+    from model_router import ModelRouter
+    from persona_cache import PersonaCache
+    from benchmarks.corpus import build_mailbox
+    from benchmarks.fakes import FakeGmailService, FakeGroqClient, FakeSheetsClient
+
+    mailbox = build_mailbox(args.digests, args.queries, args.fresh_ratio, args.relevant_ratio, seed)
+    gmail = FakeGmailService(mailbox, latency=args.gmail_latency,
+                             failure_rate=args.failure_rate, seed=seed)
+    groq = FakeGroqClient(latency=args.groq_latency, failure_rate=args.failure_rate, seed=seed)
+    sheets = FakeSheetsClient(latency=args.sheets_latency, failure_rate=args.failure_rate, seed=seed)
+
+    gmail_client.set_gmail_service(gmail)
+    pitch_generator.set_groq_client(groq)
+    sheets_client.set_sheets_client(sheets)
+    # Fresh spool, dedup index, caches and model router state for every run
+    spool._spool = spool.Spool(os.path.join(workdir, f"spool-{seed}.db"))
+    dedup_index._dedup_index = dedup_index.DedupIndex(os.path.join(workdir, f"dedup-{seed}.db"))
+    completion_cache._completion_cache = completion_cache.CompletionCache(
+        os.path.join(workdir, f"completions-{seed}.db")
+    )
+    pitch_generator.persona_cache = PersonaCache(
+        os.path.join(workdir, f"personas-{seed}.json"), ttl_seconds=3600, max_entries=64
+    )
+    pitch_generator.router = ModelRouter(
+        pitch_generator.PRIMARY_MODEL, pitch_generator.FALLBACK_MODEL,
+        pitch_generator._chat_completion, state_path=os.path.join(workdir, f"router-{seed}.json")
+    )
+
+    timer = StageTimer()
+    timer.wrap(main, "fetch_haro_emails", "fetch")
+    timer.wrap(main, "fetch_new_haro_emails", "fetch")
+    timer.wrap(main, "route_haro_email", "parse")
+    timer.wrap(pipeline, "generate_pitch", "generate")
+    timer.wrap(main, "send_replies", "send")
+    timer.wrap(main, "append_rows", "log")
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    try:
+        with output:
+            main.process_haro_once(force_run=True, service=gmail)
+    finally:
+        wall = time.perf_counter() - start
+        timer.restore()
+        gmail_client.set_gmail_service(None)
+        pitch_generator.set_groq_client(None)
+        sheets_client.set_sheets_client(None)
+
+    sent = len(gmail.sent)
+    return {
+        "wall_s": round(wall, 4),
+        "pitches_sent": sent,
+        "pitches_per_s": round(sent / wall, 2) if wall else 0.0,
+        "requests": {"gmail": gmail.calls, "groq": groq.calls, "sheets": sheets.calls},
+        "stages": timer.summary(),
+    }
+
+
+def _print_report(runs: list[dict]):
+    for i, run in enumerate(runs, 1):
+        print(f"Run {i}: {run['wall_s']:.3f}s wall, {run['pitches_sent']} pitches sent "
+              f"({run['pitches_per_s']}/s), requests {run['requests']}")
+        print(f"  {'stage':<10}{'calls':>7}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}")
+        for stage in ("fetch", "parse", "generate", "send", "log"):
+            s = run["stages"].get(stage)
+            if s:
+                print(f"  {stage:<10}{s['calls']:>7}{s['total_s']:>10.3f}{s['mean_ms']:>10.2f}{s['p95_ms']:>10.2f}")
+
+
+def main(argv=None):
+    args = _parse_args(argv if argv is not None else sys.argv[1:])
+    with tempfile.TemporaryDirectory(prefix="haro-bench-") as workdir:
+        _prepare_environment(workdir, args)
+        runs = [run_once(args, args.seed + i, workdir) for i in range(args.repeat)]
+    _print_report(runs)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
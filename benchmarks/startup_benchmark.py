@@ -0,0 +1,164 @@
+"""
+Startup benchmark: how long a fresh `python main.py` process takes before
+it does any real work.
+
+Each scenario runs in a new interpreter with `-X importtime`:
+
+    import         import main only
+    outside        a run outside the processing windows
+    no-mail        a forced run against a mailbox with no HARO email
+
+and reports wall time, the import time of main, the slowest imports and
+which heavy client libraries got loaded. Usage:
+
+    python -m benchmarks.startup_benchmark [--repeat 5] [--top 10] [--json startup.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should only be imported once a run has work to do
+HEAVY_MODULES = ("groq", "gspread", "numpy", "googleapiclient", "tiktoken")
+
+_SETUP = """
+import sys
+import main
+"""
+
+_EMPTY_GMAIL = """
+class EmptyGmail:
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, **kwargs):
+        return self
+
+    def execute(self):
+        return {}
+"""
+
+SCENARIOS = {
+    "import": _SETUP,
+    "outside": _SETUP + """
+main.is_within_processing_window = lambda verbose=True: False
+main.process_haro_once()
+""",
+    "no-mail": _SETUP + _EMPTY_GMAIL + """
+main.process_haro_once(force_run=True, service=EmptyGmail())
+""",
+}
+
+_REPORT = """
+import json
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print("STARTUP_REPORT " + json.dumps({{"heavy_modules": heavy}}))
+"""
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """
+    Cumulative microseconds per module from `-X importtime` output.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            modules[m.group(4)] = int(m.group(2))
+    return modules
+
+
+def run_scenario(name: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    for var in ("GROQ_API_KEY", "SHEETS_CREDENTIALS"):
+        env.pop(var, None)
+    env.update({
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "HARO_RUN_REPORT": os.path.join(workdir, "run_report.json"),
+        "HARO_SPOOL_PATH": os.path.join(workdir, "spool.db"),
+        "HARO_DEDUP_PATH": os.path.join(workdir, "dedup.db"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "completions.db"),
+        "GMAIL_SYNC_STATE_FILE": os.path.join(workdir, "sync_state.json"),
+        "PERSONA_CACHE_FILE": os.path.join(workdir, "persona_cache.json"),
+        "GMAIL_DISCOVERY_CACHE": os.path.join(workdir, "gmail_discovery.json"),
+        "GROQ_ROUTER_STATE_FILE": os.path.join(workdir, "router_state.json"),
+    })
+    code = SCENARIOS[name] + _REPORT.format(heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT,
+                          env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"scenario {name!r} failed:\n{proc.stderr[-2000:]}")
+
+    report = {}
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_REPORT "):
+            report = json.loads(line[len("STARTUP_REPORT "):])
+    modules = _parse_importtime(proc.stderr)
+    return {
+        "wall_s": wall,
+        "import_main_s": modules.get("main", 0) / 1e6,
+        "modules": modules,
+        "heavy_modules": report.get("heavy_modules", []),
+    }
+
+
+def summarize(runs: list[dict], top: int) -> dict:
+    # Slowest imports by median cumulative time across the runs
+    names = set().union(*(r["modules"] for r in runs))
+    medians = {n: statistics.median(r["modules"].get(n, 0) for r in runs) / 1e6 for n in names}
+    slowest = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "wall_s": round(statistics.median(r["wall_s"] for r in runs), 4),
+        "import_main_s": round(statistics.median(r["import_main_s"] for r in runs), 4),
+        "heavy_modules": sorted(set().union(*(r["heavy_modules"] for r in runs))),
+        "slowest_imports": [{"module": n, "cumulative_s": round(s, 4)} for n, s in slowest],
+    }
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to show")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="only run these scenarios")
+    parser.add_argument("--json", dest="json_path", help="also write the profile to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv if argv is not None else sys.argv[1:])
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="haro-startup-") as workdir:
+        for name in args.scenario or SCENARIOS:
+            runs = [run_scenario(name, workdir) for _ in range(args.repeat)]
+            results[name] = summarize(runs, args.top)
+
+    for name, result in results.items():
+        heavy = ", ".join(result["heavy_modules"]) or "none"
+        print(f"{name:<10} wall {result['wall_s'] * 1000:8.1f} ms   "
+              f"import main {result['import_main_s'] * 1000:7.1f} ms   heavy: {heavy}")
+        for entry in result["slowest_imports"]:
+            print(f"    {entry['module']:<40}{entry['cumulative_s'] * 1000:8.1f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "python": sys.version.split()[0],
+                       "scenarios": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
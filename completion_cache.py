@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from storage import connect
+
+COMPLETION_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "haro_completions.db")
+
+# Cached completions older than this are generated again
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "72"))
+
+# Least recently used completions beyond this are evicted
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
+# "true": never answer from the cache (fresh completions still refresh it)
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+
+# Request parameters that change the completion; transport options such as
+# stream or timeout do not
+_KEY_PARAMS = ("temperature", "max_tokens", "top_p", "response_format", "stop", "seed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    finish_reason TEXT,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completions_used_at ON completions (used_at);
+"""
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def completion_key(request: dict) -> str:
+    """
+    Cache key for a chat completion request: the model, the parameters that
+    affect the output and the messages with whitespace normalized, hashed.
+    """
+    payload = {
+        "model": request.get("model"),
+        "params": {k: request[k] for k in _KEY_PARAMS if request.get(k) is not None},
+        "messages": [(m["role"], _normalize(m["content"])) for m in request.get("messages", [])],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Persistent cache of Groq completions, so replaying a run (after a crash,
+    with --force, or for a re-sent query) costs no tokens. Entries expire
+    after `ttl_seconds`; beyond `max_entries` the least recently used ones
+    are evicted. With `bypass` set, lookups always miss.
+    """
+
+    def __init__(self, path: str = COMPLETION_CACHE_PATH,
+                 ttl_seconds: float = LLM_CACHE_TTL_HOURS * 3600,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, bypass: bool = LLM_CACHE_BYPASS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(_SCHEMA)
+        self.evict_expired()
+
+    def get(self, key: str) -> dict | None:
+        """
+        The cached {"model", "content", "finish_reason"} for `key`, or None.
+        """
+        if self.bypass:
+            return None
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT model, content, finish_reason FROM completions "
+                "WHERE key = ? AND created_at >= ?",
+                (key, cutoff),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE completions SET used_at = ? WHERE key = ?", (time.time(), key))
+        return {"model": row[0], "content": row[1], "finish_reason": row[2]}
+
+    def put(self, key: str, model: str, content: str, finish_reason: str | None):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions "
+                "(key, model, content, finish_reason, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, finish_reason, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM completions WHERE created_at < ?", (cutoff,))
+            return cur.rowcount
+
+
+_completion_cache = None
+
+
+def get_completion_cache() -> CompletionCache | None:
+    """
+    Return the process-wide completion cache, opening it on first use.
+    None if caching is disabled (LLM_CACHE_PATH="").
+    """
+    global _completion_cache
+    if _completion_cache is None and COMPLETION_CACHE_PATH:
+        _completion_cache = CompletionCache()
+    return _completion_cache
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+from storage import connect
+
+DEDUP_INDEX_PATH = os.getenv("HARO_DEDUP_PATH", "haro_dedup.db")
+
+# Queries pitched longer ago than this may be pitched again
+DEDUP_TTL_DAYS = float(os.getenv("HARO_DEDUP_TTL_DAYS", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pitched_queries (
+    fingerprint TEXT PRIMARY KEY,
+    pitched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pitched_queries_pitched_at ON pitched_queries (pitched_at);
+"""
+
+
+class DedupIndex:
+    """
+    Persistent set of query fingerprints (see haro_parser.query_fingerprint)
+    that were already pitched, so a query repeated in a later HARO edition
+    is skipped before any LLM call. Entries expire after `ttl_seconds`.
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, ttl_seconds: float = DEDUP_TTL_DAYS * 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(_SCHEMA)
+        self.evict_expired()
+
+    def __contains__(self, fingerprint: str) -> bool:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM pitched_queries WHERE fingerprint = ? AND pitched_at >= ?",
+                (fingerprint, cutoff),
+            ).fetchone()
+        return row is not None
+
+    def add(self, fingerprint: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pitched_queries (fingerprint, pitched_at) VALUES (?, ?)",
+                (fingerprint, time.time()),
+            )
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM pitched_queries WHERE pitched_at < ?", (cutoff,))
+            return cur.rowcount
+
+
+_dedup_index = None
+
+
+def get_dedup_index() -> DedupIndex:
+    """
+    Return the process-wide dedup index, opening it on first use.
+    """
+    global _dedup_index
+    if _dedup_index is None:
+        _dedup_index = DedupIndex()
+    return _dedup_index
@@ -1,11 +1,45 @@
 import base64
+import functools
+import json
 import os
-from datetime import datetime, timezone
-
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import random
 import re
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser
+from email.utils import format_datetime, make_msgid
+
+from mail_body import message_text, parse_raw, payload_text
+from metrics import incr, span
+
+HARO_SEARCH_QUERY = 'is:unread subject:"HARO"'
+
+# Messages per Gmail batch HTTP call. Gmail accepts up to 100, but larger
+# batches are more likely to trip per-user rate limits.
+BATCH_CHUNK_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+
+# Sends that Gmail answered with a retryable status (rate limit, server
+# error) are retried up to SEND_RETRIES times with exponential backoff
+SEND_RETRIES = int(os.getenv("GMAIL_SEND_RETRIES", "3"))
+SEND_BACKOFF_SECONDS = 1.0
+_RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# send_replies result for a message whose batch call failed in transit: it
+# may or may not have reached Gmail (see find_sent_message)
+SEND_UNCONFIRMED = object()
+
+# Format digests are downloaded in: "full" (JSON tree of MIME parts) or
+# "raw" (RFC 822 source, parsed locally with the stdlib email parser)
+BODY_FORMAT = os.getenv("GMAIL_BODY_FORMAT", "full")
+
+# Local copy of the Gmail API discovery document, so building the service
+# never fetches or re-reads it from the client library ("" disables it)
+DISCOVERY_CACHE_FILE = os.getenv("GMAIL_DISCOVERY_CACHE", ".gmail_discovery.json")
+
+# Local file holding the Gmail historyId cursor for incremental sync
+SYNC_STATE_FILE = os.getenv("GMAIL_SYNC_STATE_FILE", ".haro_sync_state.json")
+
 
 def extract_reply_to_address(email_body: str) -> str | None:
     """
@@ -18,7 +52,68 @@ def extract_reply_to_address(email_body: str) -> str | None:
         return match.group(1).strip()
     return None
 
+# Service installed with set_gmail_service, e.g. an offline stand-in
+_service_override = None
+
+
+def set_gmail_service(service):
+    """
+    Make get_gmail_service return `service` instead of the real API client.
+    Pass None to go back to the real client.
+    """
+    global _service_override
+    _service_override = service
+
+
+def _load_discovery_document(path: str) -> dict | None:
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_discovery_document(document: dict | None, path: str):
+    if not path or not document:
+        return
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Failed to cache Gmail discovery document: {e}")
+
+
+def _build_gmail_service(credentials, cache_path: str | None = None):
+    """
+    Build the Gmail client from the cached discovery document, or with
+    googleapiclient's discovery on the first run (then cache the document).
+    """
+    # Imported here: googleapiclient.discovery alone takes a noticeable
+    # share of startup and is only needed once a run talks to Gmail
+    from googleapiclient.discovery import build, build_from_document
+
+    cache_path = DISCOVERY_CACHE_FILE if cache_path is None else cache_path
+    document = _load_discovery_document(cache_path)
+    if document is not None:
+        try:
+            return build_from_document(document, credentials=credentials)
+        except Exception as e:
+            print(f"⚠️ Cached Gmail discovery document is unusable, rebuilding it: {e}")
+
+    service = build("gmail", "v1", credentials=credentials)
+    _save_discovery_document(getattr(service, "_rootDesc", None), cache_path)
+    return service
+
+
 def get_gmail_service():
+    if _service_override is not None:
+        return _service_override
+    from google.oauth2.credentials import Credentials
+
     try:
         creds = Credentials(
             None,
@@ -28,8 +123,7 @@ def get_gmail_service():
             client_secret=os.getenv("GMAIL_CLIENT_SECRET"),
             scopes=["https://www.googleapis.com/auth/gmail.modify"],
         )
-        service = build("gmail", "v1", credentials=creds)
-        return service
+        return _build_gmail_service(creds)
     except Exception as e:
         print(f"❌ Failed to create Gmail service: {e}")
         raise
@@ -44,109 +138,429 @@ def _parse_internal_date(ms_str: str) -> datetime:
     return datetime.fromtimestamp(seconds, tz=timezone.utc)
 
 
-def fetch_haro_emails(service):
+def list_message_ids(service, query: str) -> list[str]:
+    """
+    Return the ids of all messages matching `query`, following nextPageToken
+    so results are not cut off at the first page.
+    """
+    ids = []
+    page_token = None
+    while True:
+        with span("gmail.list"):
+            results = service.users().messages().list(
+                userId="me", q=query, pageToken=page_token
+            ).execute()
+        ids.extend(m["id"] for m in results.get("messages", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return ids
+
+
+def batch_get_messages(service, message_ids: list[str], fmt: str = "full",
+                       chunk_size: int | None = None, **get_kwargs) -> list[dict]:
+    """
+    Fetch many messages with Gmail batch requests, `chunk_size` per HTTP call.
+    Items that fail inside a batch (usually rate limiting) are retried once
+    individually; messages that still fail are skipped with a warning.
+    Results keep the order of `message_ids`.
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    fetched = {}
+    failed = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            failed.append(request_id)
+        else:
+            fetched[request_id] = response
+
+    for i in range(0, len(message_ids), chunk_size):
+        chunk = message_ids[i:i + chunk_size]
+        batch = service.new_batch_http_request(callback=on_response)
+        for msg_id in chunk:
+            batch.add(
+                service.users().messages().get(
+                    userId="me", id=msg_id, format=fmt, **get_kwargs
+                ),
+                request_id=msg_id,
+            )
+        try:
+            with span("gmail.batch_get", format=fmt):
+                batch.execute()
+        except Exception as e:
+            print(f"⚠️ Gmail batch request failed ({len(chunk)} messages): {e}")
+            failed.extend(m for m in chunk if m not in fetched and m not in failed)
+
+    if failed:
+        incr("gmail.batch_item_retries", len(failed))
+    for msg_id in failed:
+        try:
+            with span("gmail.get", format=fmt):
+                fetched[msg_id] = service.users().messages().get(
+                    userId="me", id=msg_id, format=fmt, **get_kwargs
+                ).execute()
+        except Exception as e:
+            print(f"⚠️ Failed to fetch message {msg_id}: {e}")
+
+    return [fetched[m] for m in message_ids if m in fetched]
+
+
+def _http_status(error: Exception) -> int | None:
+    """
+    HTTP status of a googleapiclient HttpError, or None for any other error.
+    Read duck-typed so that importing this module does not load
+    googleapiclient.
+    """
+    status = getattr(getattr(error, "resp", None), "status", None)
+    return int(status) if status is not None else None
+
+
+def _header(msg_detail: dict, name: str) -> str:
+    for h in msg_detail.get("payload", {}).get("headers", []):
+        if h["name"].lower() == name.lower():
+            return h["value"]
+    return ""
+
+
+def _fetch_attachment(service, msg_id: str, attachment_id: str) -> str:
+    with span("gmail.get_attachment"):
+        return service.users().messages().attachments().get(
+            userId="me", messageId=msg_id, id=attachment_id
+        ).execute().get("data", "")
+
+
+def _parse_message(msg_detail: dict, service=None) -> dict:
+    """
+    Parse a "full" or "raw" format message. The body is the best text part
+    found anywhere in the MIME tree (see mail_body); `service` is used to
+    download a body Gmail returned only as an attachmentId.
+    """
+    if "raw" in msg_detail:
+        message = parse_raw(msg_detail["raw"])
+        subject, message_id, references = (
+            str(message.get(name, "")) for name in ("Subject", "Message-ID", "References"))
+        body, mime_type = message_text(message)
+    else:
+        subject, message_id, references = (
+            _header(msg_detail, name) for name in ("Subject", "Message-ID", "References"))
+        fetch = functools.partial(_fetch_attachment, service, msg_detail["id"]) if service else None
+        body, mime_type = payload_text(msg_detail.get("payload", {}), fetch)
+
+    if mime_type == "text/html":
+        incr("gmail.html_bodies")
+    if not body.strip():
+        print(f"⚠️ No text body found in email {msg_detail['id']} ({subject}).")
+        incr("gmail.empty_bodies")
+
+    internal_date = msg_detail.get("internalDate")
+    timestamp = _parse_internal_date(internal_date) if internal_date else None
+
+    return {
+        "id": msg_detail["id"],
+        "threadId": msg_detail.get("threadId"),
+        "subject": subject,
+        "message_id": message_id,
+        "references": references,
+        "body": body,
+        "timestamp": timestamp
+    }
+
+
+def _is_haro_candidate(msg_meta: dict, cutoff: datetime | None) -> bool:
+    """
+    Cheap checks on a metadata-only message: subject mentions HARO and,
+    if a cutoff is given, it arrived after it.
+    """
+    if "haro" not in _header(msg_meta, "Subject").lower():
+        return False
+    if cutoff is None:
+        return True
+    internal_date = msg_meta.get("internalDate")
+    return bool(internal_date) and _parse_internal_date(internal_date) >= cutoff
+
+
+def _fetch_fresh_haro_messages(service, message_ids: list[str],
+                               cutoff: datetime | None, chunk_size: int | None):
+    """
+    Phase one fetches only metadata for `message_ids`; phase two downloads
+    the HARO digests newer than `cutoff` in BODY_FORMAT.
+    """
+    if not message_ids:
+        return []
+
+    metadata = batch_get_messages(
+        service, message_ids, fmt="metadata", chunk_size=chunk_size,
+        metadataHeaders=["Subject"],
+    )
+    wanted = [m["id"] for m in metadata if _is_haro_candidate(m, cutoff)]
+    if len(wanted) < len(message_ids):
+        print(f"⏩ Skipping {len(message_ids) - len(wanted)} stale or non-HARO emails without downloading them.")
+
+    details = batch_get_messages(service, wanted, fmt=BODY_FORMAT, chunk_size=chunk_size)
+    emails = []
+    for detail in details:
+        try:
+            emails.append(_parse_message(detail, service))
+        except Exception as e:
+            # One malformed digest must not cost the others
+            print(f"⚠️ Skipping email {detail.get('id')} that could not be parsed: {type(e).__name__}: {e}")
+            incr("gmail.unparsable")
+    return emails
+
+
+def _cutoff(max_age_minutes: int | None) -> datetime | None:
+    if max_age_minutes is None:
+        return None
+    return datetime.now(timezone.utc) - timedelta(minutes=max_age_minutes)
+
+
+def fetch_haro_emails(service, max_age_minutes: int | None = None,
+                      chunk_size: int | None = None):
     """
     Fetch unread HARO emails using subject:"HARO".
+
+    Runs in two phases so stale digests are never downloaded in full:
+    first only internalDate and Subject are fetched (format="metadata"),
+    then full bodies are fetched for messages that are HARO digests newer
+    than `max_age_minutes`. The age limit is also pushed into the Gmail
+    search as an `after:` filter. Both phases use batch requests.
+
     Returns list of dicts with:
         id, threadId, subject, body, timestamp (datetime, UTC)
     """
-    try:
-        results = service.users().messages().list(
-            userId="me",
-            q='is:unread subject:"HARO"'
-        ).execute()
+    query = HARO_SEARCH_QUERY
+    cutoff = _cutoff(max_age_minutes)
+    if cutoff is not None:
+        query += f" after:{int(cutoff.timestamp())}"
 
-        messages = results.get("messages", [])
-        print(f"📧 Found {len(messages)} unread HARO emails.")
+    try:
+        message_ids = list_message_ids(service, query)
+        print(f"📧 Found {len(message_ids)} unread HARO emails.")
     except Exception as e:
         print(f"❌ Failed to fetch HARO emails: {e}")
         return []
-    
-    emails = []
 
-    for msg in messages:
-        msg_detail = service.users().messages().get(
-            userId="me", id=msg["id"], format="full"
-        ).execute()
-
-        headers = msg_detail.get("payload", {}).get("headers", [])
-        subject = ""
-        for h in headers:
-            if h["name"].lower() == "subject":
-                subject = h["value"]
-                break
-
-        # Body (simplest: use the first text/plain part or fallback to body)
-        body = ""
-        payload = msg_detail.get("payload", {})
-        if "parts" in payload:
-            for part in payload["parts"]:
-                if part.get("mimeType") == "text/plain":
-                    data = part["body"].get("data")
-                    if data:
-                        body = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-                        break
-        else:
-            data = payload.get("body", {}).get("data")
-            if data:
-                body = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
+    return _fetch_fresh_haro_messages(service, message_ids, cutoff, chunk_size)
 
-        internal_date = msg_detail.get("internalDate")
-        timestamp = _parse_internal_date(internal_date) if internal_date else None
 
-        emails.append({
-            "id": msg_detail["id"],
-            "threadId": msg_detail.get("threadId"),
-            "subject": subject,
-            "body": body,
-            "timestamp": timestamp
-        })
+def load_sync_cursor(path: str | None = None) -> str | None:
+    """
+    Return the historyId saved by the last incremental sync, if any.
+    """
+    try:
+        with open(path or SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("historyId")
+    except (OSError, ValueError):
+        return None
 
-    return emails
+
+def save_sync_cursor(history_id: str, path: str | None = None):
+    """
+    Persist the historyId cursor. Written to a temp file and renamed so a
+    crash never leaves a half-written state file behind.
+    """
+    path = path or SYNC_STATE_FILE
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"historyId": str(history_id)}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _list_history_message_ids(service, start_history_id: str) -> tuple[list[str], str]:
+    """
+    Ids of inbox messages added since `start_history_id`, plus the newest
+    historyId seen. Raises HttpError 404 when the cursor has expired.
+    """
+    ids = []
+    latest = start_history_id
+    page_token = None
+    while True:
+        with span("gmail.history_list"):
+            results = service.users().history().list(
+                userId="me",
+                startHistoryId=start_history_id,
+                historyTypes=["messageAdded"],
+                labelId="INBOX",
+                pageToken=page_token,
+            ).execute()
+        for record in results.get("history", []):
+            for added in record.get("messagesAdded", []):
+                msg_id = added["message"]["id"]
+                if msg_id not in ids:
+                    ids.append(msg_id)
+        latest = results.get("historyId", latest)
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return ids, latest
+
+
+def fetch_new_haro_emails(service, max_age_minutes: int | None = None,
+                          chunk_size: int | None = None,
+                          state_path: str | None = None):
+    """
+    Incremental alternative to fetch_haro_emails that does not rely on the
+    UNREAD label. Uses users.history.list from the saved historyId cursor to
+    find only messages added since the last sync, and falls back to a search
+    for unread HARO emails when there is no cursor or Gmail reports it
+    expired.
+
+    Returns (emails, history_id). Pass history_id to save_sync_cursor once
+    the emails have been handled, so a crash mid-run does not skip them.
+    """
+    cutoff = _cutoff(max_age_minutes)
+    cursor = load_sync_cursor(state_path)
+    message_ids = None
+
+    if cursor:
+        try:
+            message_ids, history_id = _list_history_message_ids(service, cursor)
+            print(f"📧 Found {len(message_ids)} new inbox messages since last sync.")
+        except Exception as e:
+            status = _http_status(e)
+            if status is None:
+                raise
+            if status != 404:
+                print(f"❌ Failed to read Gmail history: {e}")
+                return [], cursor
+            print("⚠️ Gmail sync cursor expired. Falling back to a full search.")
+
+    if message_ids is None:
+        try:
+            # Take the cursor before searching so nothing arriving during
+            # the search is missed next time
+            with span("gmail.get_profile"):
+                history_id = service.users().getProfile(userId="me").execute()["historyId"]
+            # Digests handled before the cursor expired were marked read
+            query = 'in:inbox is:unread subject:"HARO"'
+            if cutoff is not None:
+                query += f" after:{int(cutoff.timestamp())}"
+            message_ids = list_message_ids(service, query)
+            print(f"📧 Found {len(message_ids)} HARO emails in full search.")
+        except Exception as e:
+            print(f"❌ Failed to fetch HARO emails: {e}")
+            return [], cursor
+
+    return _fetch_fresh_haro_messages(service, message_ids, cutoff, chunk_size), history_id
 
 
 def mark_as_read(service, msg_id: str):
     try:
-        service.users().messages().modify(
-            userId="me",
-            id=msg_id,
-            body={"removeLabelIds": ["UNREAD"]}
-        ).execute()
-    except HttpError as e:
+        with span("gmail.modify"):
+            service.users().messages().modify(
+                userId="me",
+                id=msg_id,
+                body={"removeLabelIds": ["UNREAD"]}
+            ).execute()
+    except Exception as e:
+        if _http_status(e) is None:
+            raise
         print("⚠️ Failed to mark as read:", e)
 
 
-def send_reply(service, thread_id: str, original_subject: str,
-               body_text: str, reply_to: str, from_address: str):
+def _reply_subject(original_subject: str) -> str:
+    if not original_subject.lower().startswith("re:"):
+        return "Re: " + original_subject
+    return original_subject
 
-    if not reply_to:
-        print("⚠️ No reply-to address found. Cannot send pitch.")
-        return
 
-    if not original_subject.lower().startswith("re:"):
-        subject = "Re: " + original_subject
-    else:
-        subject = original_subject
+def build_reply(email: dict, body_text: str, reply_to: str, from_address: str | None) -> dict:
+    """
+    Gmail message resource for a pitch replying to the HARO `email` (as
+    returned by fetch_haro_emails). In-Reply-To/References point at the HARO
+    message and threadId keeps the pitch in its thread.
+    """
+    msg = EmailMessage()
+    if from_address:
+        msg["From"] = from_address
+    msg["To"] = reply_to
+    msg["Subject"] = _reply_subject(email.get("subject", ""))
+    msg["Date"] = format_datetime(datetime.now(timezone.utc))
+    domain = from_address.rpartition("@")[2] if from_address and "@" in from_address else None
+    msg["Message-ID"] = make_msgid(domain=domain)
+    original_id = email.get("message_id")
+    if original_id:
+        msg["In-Reply-To"] = original_id
+        msg["References"] = " ".join(filter(None, [email.get("references"), original_id]))
+    msg.set_content(body_text)
 
-    message_text = f"{body_text}\n"
+    message = {"raw": base64.urlsafe_b64encode(msg.as_bytes()).decode("ascii")}
+    if email.get("threadId"):
+        message["threadId"] = email["threadId"]
+    return message
 
-    raw_message = (
-        f"From: {from_address}\r\n"
-        f"To: {reply_to}\r\n"
-        f"Subject: {subject}\r\n"
-        f"\r\n"
-        f"{message_text}"
-    )
 
-    encoded = base64.urlsafe_b64encode(raw_message.encode("utf-8")).decode("utf-8")
+def _is_retryable(error: Exception) -> bool:
+    return _http_status(error) in _RETRYABLE_STATUSES
 
-    message = {
-        "raw": encoded
-    }
 
-    try:
-        sent = service.users().messages().send(userId="me", body=message).execute()
-        print("✉️ Pitch sent successfully:", sent.get("id"))
-    except HttpError as e:
-        print("⚠️ Failed to send reply:", e)
+def send_replies(service, messages: list[dict], chunk_size: int | None = None) -> list[str | None]:
+    """
+    Send many messages (see build_reply) with Gmail batch requests. Returns
+    the Gmail id of each sent message, None where sending failed, or
+    SEND_UNCONFIRMED, in the order of `messages`.
+
+    Items Gmail rejects with a rate limit or server error are retried with
+    exponential backoff. If a whole batch call fails in transit its items are
+    not retried, since some of them may already have been sent; they are
+    returned as SEND_UNCONFIRMED.
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    sent_ids = [None] * len(messages)
+    pending = list(range(len(messages)))
+
+    for attempt in range(SEND_RETRIES + 1):
+        if attempt:
+            incr("gmail.send_retries", len(pending))
+            delay = SEND_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            time.sleep(random.uniform(delay / 2, delay))
+        retry = []
+        answered = set()
 
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            answered.add(index)
+            if exception is None:
+                sent_ids[index] = response.get("id")
+                print("✉️ Pitch sent successfully:", sent_ids[index])
+            elif _is_retryable(exception) and attempt < SEND_RETRIES:
+                retry.append(index)
+            else:
+                print("⚠️ Failed to send reply:", exception)
+
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            batch = service.new_batch_http_request(callback=on_response)
+            for index in chunk:
+                batch.add(
+                    service.users().messages().send(userId="me", body=messages[index]),
+                    request_id=str(index),
+                )
+            try:
+                with span("gmail.batch_send"):
+                    batch.execute()
+            except Exception as e:
+                print(f"⚠️ Gmail batch send failed ({len(chunk)} messages): {e}")
+                for index in chunk:
+                    if index not in answered:
+                        sent_ids[index] = SEND_UNCONFIRMED
+
+        if not retry:
+            break
+        pending = sorted(retry)
+
+    return sent_ids
+
+
+def find_sent_message(service, message: dict) -> str | None:
+    """
+    Gmail id of `message` (see build_reply) if it reached the mailbox, found
+    by its Message-ID header; None if it was never sent.
+    """
+    headers = BytesHeaderParser().parsebytes(base64.urlsafe_b64decode(message["raw"]))
+    message_id = (headers.get("Message-ID") or "").strip().strip("<>")
+    if not message_id:
+        return None
+    ids = list_message_ids(service, f"in:sent rfc822msgid:{message_id}")
+    return ids[0] if ids else None
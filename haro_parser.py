@@ -1,95 +1,112 @@
+import hashlib
+import os
 import re
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
 
-# High-authority niche keywords (business + tech + energy + consumer)
-NICHE_KEYWORDS = [
-    # Business & Finance
-    "business", "budget", "budgeting", "small business", "startup",
-    "entrepreneur", "founder", "scaling", "cash flow", "financial planning",
-    "cost of living", "inflation", "personal finance", "saving money",
-    "household expenses", "economy", "economic trends", "market trends",
-    "productivity", "leadership", "remote work", "future of work",
-    "subscription management", "recurring payments", "digital wallets",
-    "investing", "stocks", "cryptocurrency", "financial technology", "wealth management",
-    "financial literacy", "expense tracking", "payment apps", "fintech apps",
-    "cost optimization", "business strategy", "economic development",
-
-    # Technology & Digital Transformation
-    "ai", "artificial intelligence", "automation", "cloud",
-    "digital transformation", "cybersecurity", "data", "saas",
-    "workflow automation", "tech trends", "digital payments", "fintech",
-    "iot", "smart devices", "home automation", "smart home",
-    "mobile apps", "online services", "payment apps", "digital innovation",
-    "big data", "machine learning", "blockchain", "tech adoption", "remote tech",
-    "app development", "digital workflow", "cloud computing", "software solutions",
-    "emerging technologies", "tech infrastructure", "IT solutions", "smart gadgets",
-
-    # Energy, Utilities & Sustainability
-    "electricity", "energy", "power", "utility", "utilities",
-    "renewable", "solar", "wind", "hydro", "smart meter", "smart home",
-    "energy efficiency", "energy saving", "electricity prices",
-    "electricity rates", "billing", "digital billing", "online billing",
-    "sustainability", "climate", "carbon footprint", "green energy",
-    "energy crisis", "energy policy", "public utilities", "infrastructure",
-    "smart city", "load shedding", "energy consumption", "grid management",
-    "energy technology", "energy apps", "metering solutions", "demand response",
-    "electric vehicles", "battery storage", "power management", "smart grids",
-    "home energy management", "eco-friendly energy", "renewable adoption",
-
-    # Consumer Behavior & Lifestyle
-    "consumer", "consumer behavior", "consumer rights",
-    "household management", "money saving tips", "budgeting habits",
-    "financial literacy", "daily expenses", "energy habits", "utility management",
-    "lifestyle tech", "eco-friendly living", "cost-conscious behavior",
-    "smart spending", "home efficiency", "digital lifestyle", "app usage trends",
-    "shopping habits", "subscription services", "home budgeting",
-    "personal finance management", "financial planning", "habit tracking",
-    "cost reduction", "consumer trends", "behavioral insights", "lifestyle apps",
-
-    # Emerging Markets & Global Trends
-    "emerging markets", "developing countries", "global trends",
-    "international comparisons", "digital adoption", "fintech adoption",
-    "energy solutions abroad", "utility access", "tech in developing countries",
-    "household tech trends", "global electricity trends", "cross-country analysis",
-    "economic development", "financial inclusion", "energy inclusion",
-    "mobile payment adoption", "digital literacy", "smart city trends",
-    "energy efficiency worldwide", "international case studies", "market adoption",
-    "cross-border innovation", "global consumer behavior",
-
-    # Policy, Regulation & Economics
-    "energy policy", "electricity regulation", "public utilities",
-    "tariff structures", "subsidies", "energy economics",
-    "price inflation", "market regulations", "utility governance",
-    "policy impact", "renewable incentives", "infrastructure development",
-    "government programs", "energy reforms", "economic policy",
-    "legislation", "regulatory compliance", "environmental policy",
-    "climate regulations", "utility pricing", "policy analysis",
-    "tax incentives", "budget policy", "fiscal policy", "international policy",
-
-    # Smart Home & Internet of Things (IoT)
-    "home automation", "smart appliances", "connected home", "iot devices",
-    "energy tracking", "home security", "automation apps", "remote monitoring",
-    "smart thermostats", "connected utilities", "smart lighting",
-    "household sensors", "tech-enabled living", "smart hubs",
-    "data-driven home management", "AI in home", "smart gadget adoption",
-    "smart energy solutions", "smart grids", "home innovation", "automation trends",
-
-    # Sustainability & Environment
-    "renewable energy", "solar power", "wind energy", "carbon footprint",
-    "energy efficiency", "green tech", "eco-friendly solutions",
-    "climate change", "sustainable living", "environmental responsibility",
-    "green homes", "carbon reduction", "eco-conscious behavior",
-    "smart cities", "environmental policy", "sustainable tech",
-    "clean energy adoption", "green innovation", "energy conservation",
-    "eco apps", "green initiatives", "sustainable households",
-
-    # Finance & Tech in Emerging Markets
-    "fintech adoption", "mobile payments", "digital banking", "financial inclusion",
-    "recurring payments", "digital wallets", "microfinance", "mobile money",
-    "billing solutions", "utility tech", "smart payment apps",
-    "cross-border fintech trends", "digital infrastructure", "cashless solutions",
-    "economic empowerment", "digital transformation emerging markets",
-    "financial literacy", "payment automation", "app-based payments", "online banking"
-]
+from metrics import incr
+
+# High-authority niche keywords (business + tech + energy + consumer), grouped
+# by niche: the default profile's keywords (see profiles.py). The niche of a
+# query is the category its keyword hits weigh most in.
+NICHE_CATEGORIES = {
+    "Business & Finance": [
+        "business", "budget", "budgeting", "small business", "startup",
+        "entrepreneur", "founder", "scaling", "cash flow", "financial planning",
+        "cost of living", "inflation", "personal finance", "saving money",
+        "household expenses", "economy", "economic trends", "market trends",
+        "productivity", "leadership", "remote work", "future of work",
+        "subscription management", "recurring payments", "digital wallets",
+        "investing", "stocks", "cryptocurrency", "financial technology", "wealth management",
+        "financial literacy", "expense tracking", "payment apps", "fintech apps",
+        "cost optimization", "business strategy", "economic development",
+    ],
+
+    "Technology & Digital Transformation": [
+        "ai", "artificial intelligence", "automation", "cloud",
+        "digital transformation", "cybersecurity", "data", "saas",
+        "workflow automation", "tech trends", "digital payments", "fintech",
+        "iot", "smart devices", "home automation", "smart home",
+        "mobile apps", "online services", "payment apps", "digital innovation",
+        "big data", "machine learning", "blockchain", "tech adoption", "remote tech",
+        "app development", "digital workflow", "cloud computing", "software solutions",
+        "emerging technologies", "tech infrastructure", "IT solutions", "smart gadgets",
+    ],
+
+    "Energy, Utilities & Sustainability": [
+        "electricity", "energy", "power", "utility", "utilities",
+        "renewable", "solar", "wind", "hydro", "smart meter", "smart home",
+        "energy efficiency", "energy saving", "electricity prices",
+        "electricity rates", "billing", "digital billing", "online billing",
+        "sustainability", "climate", "carbon footprint", "green energy",
+        "energy crisis", "energy policy", "public utilities", "infrastructure",
+        "smart city", "load shedding", "energy consumption", "grid management",
+        "energy technology", "energy apps", "metering solutions", "demand response",
+        "electric vehicles", "battery storage", "power management", "smart grids",
+        "home energy management", "eco-friendly energy", "renewable adoption",
+    ],
+
+    "Consumer Behavior & Lifestyle": [
+        "consumer", "consumer behavior", "consumer rights",
+        "household management", "money saving tips", "budgeting habits",
+        "financial literacy", "daily expenses", "energy habits", "utility management",
+        "lifestyle tech", "eco-friendly living", "cost-conscious behavior",
+        "smart spending", "home efficiency", "digital lifestyle", "app usage trends",
+        "shopping habits", "subscription services", "home budgeting",
+        "personal finance management", "financial planning", "habit tracking",
+        "cost reduction", "consumer trends", "behavioral insights", "lifestyle apps",
+    ],
+
+    "Emerging Markets & Global Trends": [
+        "emerging markets", "developing countries", "global trends",
+        "international comparisons", "digital adoption", "fintech adoption",
+        "energy solutions abroad", "utility access", "tech in developing countries",
+        "household tech trends", "global electricity trends", "cross-country analysis",
+        "economic development", "financial inclusion", "energy inclusion",
+        "mobile payment adoption", "digital literacy", "smart city trends",
+        "energy efficiency worldwide", "international case studies", "market adoption",
+        "cross-border innovation", "global consumer behavior",
+    ],
+
+    "Policy, Regulation & Economics": [
+        "energy policy", "electricity regulation", "public utilities",
+        "tariff structures", "subsidies", "energy economics",
+        "price inflation", "market regulations", "utility governance",
+        "policy impact", "renewable incentives", "infrastructure development",
+        "government programs", "energy reforms", "economic policy",
+        "legislation", "regulatory compliance", "environmental policy",
+        "climate regulations", "utility pricing", "policy analysis",
+        "tax incentives", "budget policy", "fiscal policy", "international policy",
+    ],
+
+    "Smart Home & Internet of Things (IoT)": [
+        "home automation", "smart appliances", "connected home", "iot devices",
+        "energy tracking", "home security", "automation apps", "remote monitoring",
+        "smart thermostats", "connected utilities", "smart lighting",
+        "household sensors", "tech-enabled living", "smart hubs",
+        "data-driven home management", "AI in home", "smart gadget adoption",
+        "smart energy solutions", "smart grids", "home innovation", "automation trends",
+    ],
+
+    "Sustainability & Environment": [
+        "renewable energy", "solar power", "wind energy", "carbon footprint",
+        "energy efficiency", "green tech", "eco-friendly solutions",
+        "climate change", "sustainable living", "environmental responsibility",
+        "green homes", "carbon reduction", "eco-conscious behavior",
+        "smart cities", "environmental policy", "sustainable tech",
+        "clean energy adoption", "green innovation", "energy conservation",
+        "eco apps", "green initiatives", "sustainable households",
+    ],
+
+    "Finance & Tech in Emerging Markets": [
+        "fintech adoption", "mobile payments", "digital banking", "financial inclusion",
+        "recurring payments", "digital wallets", "microfinance", "mobile money",
+        "billing solutions", "utility tech", "smart payment apps",
+        "cross-border fintech trends", "digital infrastructure", "cashless solutions",
+        "economic empowerment", "digital transformation emerging markets",
+        "financial literacy", "payment automation", "app-based payments", "online banking",
+    ],
+}
 
 # Excluded niches (betting, casino, gambling)
 EXCLUDED_KEYWORDS = [
@@ -100,71 +117,242 @@ EXCLUDED_KEYWORDS = [
 ]
 
 
-def is_excluded_query(text: str) -> bool:
+# Per-keyword weights for relevance scoring. Generic or ambiguous terms count
+# for less so that one passing mention does not make a query relevant;
+# anything not listed gets the default single-word or phrase weight.
+KEYWORD_WEIGHTS = {
+    "ai": 0.6, "data": 0.3, "power": 0.3, "wind": 0.3, "hydro": 0.5,
+    "business": 0.5, "budget": 0.6, "scaling": 0.3, "cloud": 0.5,
+    "consumer": 0.5, "economy": 0.6, "leadership": 0.4, "productivity": 0.5,
+    "founder": 0.5, "entrepreneur": 0.6, "startup": 0.6, "infrastructure": 0.5,
+    "climate": 0.7, "legislation": 0.4, "subsidies": 0.6, "stocks": 0.5,
+    "investing": 0.6, "utility": 0.8, "renewable": 0.8,
+}
+DEFAULT_WORD_WEIGHT = 1.0
+DEFAULT_PHRASE_WEIGHT = 1.5
+
+# Exclusion weights: unambiguous gambling terms exclude on their own, while
+# words with everyday meanings ("odds", "stakes") need a second signal.
+EXCLUDED_WEIGHTS = {
+    "odds": 0.5, "stakes": 0.5, "punt": 0.5, "bet": 0.5, "bingo": 0.5,
+}
+EXCLUSION_THRESHOLD = 1.0
+
+# Minimum score for a query to be pitched (override with HARO_RELEVANCE_THRESHOLD)
+RELEVANCE_THRESHOLD = float(os.getenv("HARO_RELEVANCE_THRESHOLD", "1.0"))
+
+
+def query_fingerprint(query: dict) -> str:
     """
-    Check if query contains excluded keywords (betting, casino, gambling).
-    Returns True if query should be excluded.
+    Stable identity of a query across digests: the reply-to address plus a
+    hash of the query text with case, punctuation and whitespace normalized.
     """
-    if not text:
-        return False
-    lower = text.lower()
-    return any(keyword in lower for keyword in EXCLUDED_KEYWORDS)
+    text = " ".join(re.findall(r"\w+", query.get("query", "").lower()))
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return f"{(query.get('reply_to') or '').lower()}:{digest}"
+
+
+# Precompiled line patterns for the streaming digest parser. A query block
+# starts at a "Summary:" line (optionally numbered, e.g. "3) Summary: ...").
+_SUMMARY_LINE_RE = re.compile(r"^\s*(?:\d+\)\s*)?summary:(.*)$", re.IGNORECASE)
+_FIELD_LINE_RE = re.compile(
+    r"^\s*(name|category|email|media outlet|deadline|query|requirements)\s*:(.*)$",
+    re.IGNORECASE,
+)
+# Navigation lines ("Back to Top", "Back to Top Back to Category Index") and
+# rules between queries
+_SEPARATOR_LINE_RE = re.compile(r"^\s*(?:back to top\b.*|-{3,}|\*{3,}|={3,})\s*$", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"Email:\s*([^\s]+)", re.IGNORECASE)
+
+# Single-line header fields -> query dict keys
+_HEADER_FIELDS = {
+    "name": "name",
+    "category": "publication",
+    "email": "reply_to",
+    "media outlet": "media_outlet",
+    "deadline": "deadline",
+}
+
+
+# HARO deadlines look like "7:00 PM EST - 21 May" or "March 12th, 5PM ET"
+_DEADLINE_TIME_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\b\.?", re.IGNORECASE)
+_DEADLINE_TZ_RE = re.compile(r"\b(E|C|M|P)(?:S|D)?T\b|\b(GMT|UTC)\b", re.IGNORECASE)
+_MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+_MONTH_NAME = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+_DEADLINE_DAY_MONTH_RE = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH_NAME}(?:,?\s+(\d{{4}}))?", re.IGNORECASE)
+_DEADLINE_MONTH_DAY_RE = re.compile(rf"\b{_MONTH_NAME}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}}))?", re.IGNORECASE)
+_DEADLINE_NUMERIC_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+# US time zone letter -> IANA zone, so EST/EDT/ET all resolve to local time
+_US_ZONES = {"E": "America/New_York", "C": "America/Chicago",
+             "M": "America/Denver", "P": "America/Los_Angeles"}
+
+
+def _deadline_date(text: str):
+    """
+    (year or None, month, day) from a deadline string, or None.
+    """
+    match = _DEADLINE_DAY_MONTH_RE.search(text)
+    if match:
+        return (int(match.group(3)) if match.group(3) else None,
+                _MONTHS[match.group(2).lower()[:3]], int(match.group(1)))
+    match = _DEADLINE_MONTH_DAY_RE.search(text)
+    if match:
+        return (int(match.group(3)) if match.group(3) else None,
+                _MONTHS[match.group(1).lower()[:3]], int(match.group(2)))
+    match = _DEADLINE_NUMERIC_RE.search(text)
+    if match:
+        year = match.group(3)
+        if year:
+            year = int(year) + (2000 if len(year) == 2 else 0)
+        return year, int(match.group(1)), int(match.group(2))
+    return None
 
 
-def is_relevant_query(text: str) -> bool:
+def parse_deadline(text: str, reference: datetime | None = None) -> datetime | None:
+    """
+    Parse a HARO deadline string into an aware UTC datetime.
+
+    `reference` (the digest's receive time, default now) fills in the
+    missing year, or the day when only a time is given. A missing time
+    means end of day; a missing time zone means US Eastern, HARO's default.
+    Returns None if no date or time can be found.
+    """
     if not text:
-        return False
-    
-    # First check if it's excluded (betting/casino)
-    if is_excluded_query(text):
-        return False
-    
-    # Then check if it matches our niche keywords
-    lower = text.lower()
-    return any(keyword in lower for keyword in NICHE_KEYWORDS)
-
-
-def extract_queries(email_body: str):
+        return None
+    reference = reference or datetime.now(timezone.utc)
+
+    tz_match = _DEADLINE_TZ_RE.search(text)
+    if tz_match and tz_match.group(2):
+        tz = timezone.utc
+    else:
+        tz = ZoneInfo(_US_ZONES[tz_match.group(1).upper() if tz_match else "E"])
+    local_ref = reference.astimezone(tz)
+
+    time_match = _DEADLINE_TIME_RE.search(text)
+    date_parts = _deadline_date(text)
+    if not time_match and not date_parts:
+        return None
+
+    if time_match:
+        hour = int(time_match.group(1)) % 12 + (12 if time_match.group(3).lower() == "p" else 0)
+        deadline_time = time(hour, int(time_match.group(2) or 0))
+    else:
+        deadline_time = time(23, 59)
+
+    try:
+        if date_parts:
+            year, month, day = date_parts
+            deadline = datetime.combine(
+                datetime(year or local_ref.year, month, day).date(), deadline_time, tz
+            )
+            # "5 Jan" in a late-December digest means next year
+            if year is None and deadline < local_ref - timedelta(days=180):
+                deadline = deadline.replace(year=deadline.year + 1)
+        else:
+            # Time only: the next time that clock time comes around
+            deadline = datetime.combine(local_ref.date(), deadline_time, tz)
+            if deadline < local_ref:
+                deadline += timedelta(days=1)
+    except ValueError:
+        return None
+    return deadline.astimezone(timezone.utc)
+
+
+def _finish_query(record: dict, sections: dict, received_at: datetime | None) -> dict:
+    record["query"] = "\n".join(sections["query"]).strip()
+    record["requirements"] = "\n".join(sections["requirements"]).strip()
+    reply_to = record.get("reply_to")
+    if reply_to:
+        record["reply_to"] = reply_to.split()[0]
+    else:
+        # Some digests put the address inside the query text
+        match = _EMAIL_RE.search(record["query"])
+        record["reply_to"] = match.group(1).strip() if match else None
+    record["deadline_at"] = parse_deadline(record["deadline"], received_at)
+    return record
+
+
+def iter_queries(lines, received_at: datetime | None = None):
     """
-    Extract individual HARO queries from a HARO email body.
-    Assumes blocks starting with 'Summary:' as usual HARO format.
-    Each query block has its own 'Email:' address.
+    Stream HARO queries out of a digest, one dict per query block, in a
+    single pass over `lines` (any iterable of text lines).
+
+    Each dict has title, publication (the category), query, reply_to,
+    name, media_outlet, deadline and requirements, plus deadline_at (the
+    deadline as a UTC datetime, resolved against `received_at`, or None).
+    Query text runs from "Query:" until "Requirements:" or the next
+    "Summary:" line.
     """
-    blocks = re.split(r"(?=Summary:)", email_body, flags=re.IGNORECASE)
-    queries = []
+    record = None
+    sections = None
+    section = None
 
-    for block in blocks:
-        if len(block.strip()) < 20:
+    for line in lines:
+        line = line.rstrip("\r\n")
+        summary = _SUMMARY_LINE_RE.match(line)
+        if summary:
+            if record is not None:
+                yield _finish_query(record, sections, received_at)
+            record = {
+                "title": summary.group(1).strip(), "publication": "", "query": "",
+                "reply_to": None, "name": "", "media_outlet": "", "deadline": "",
+                "requirements": "",
+            }
+            sections = {"query": [], "requirements": []}
+            section = None
             continue
 
-        summary = re.search(r"Summary:(.*)", block, re.IGNORECASE)
-        category = re.search(r"Category:(.*)", block, re.IGNORECASE)
-        query = re.search(r"Query:(.*?)(?=Requirements:|$)", block,
-                          re.IGNORECASE | re.DOTALL)
-        # Extract reply-to address from this query block
-        reply_to_match = re.search(r"Email:\s*([^\s]+)", block, re.IGNORECASE)
-        reply_to = reply_to_match.group(1).strip() if reply_to_match else None
+        if record is None:
+            continue  # digest header before the first query
 
-        queries.append({
-            "title": summary.group(1).strip() if summary else "",
-            "publication": category.group(1).strip() if category else "",
-            "query": query.group(1).strip() if query else "",
-            "reply_to": reply_to
-        })
+        field = _FIELD_LINE_RE.match(line)
+        if field and (section != "query" or field.group(1).lower() == "requirements"):
+            label = field.group(1).lower()
+            value = field.group(2).strip()
+            if label in ("query", "requirements"):
+                section = label
+                if value:
+                    sections[section].append(value)
+            elif not record[_HEADER_FIELDS[label]]:
+                record[_HEADER_FIELDS[label]] = value
+            continue
+
+        if section and not _SEPARATOR_LINE_RE.match(line):
+            sections[section].append(line)
 
-    return queries
+    if record is not None:
+        yield _finish_query(record, sections, received_at)
 
 
-def parse_haro_email(email_body: str):
+def extract_queries(email_body: str, received_at: datetime | None = None):
     """
-    Extract all queries and filter them by niche relevance.
-    Returns only the ones worth pitching.
+    Extract individual HARO queries from a HARO email body.
+    Assumes blocks starting with 'Summary:' as usual HARO format.
+    Each query block has its own 'Email:' address.
     """
-    all_queries = extract_queries(email_body)
-    relevant = []
+    return list(iter_queries(email_body.splitlines(), received_at))
+
 
-    for q in all_queries:
-        if is_relevant_query(q["query"]):
-            relevant.append(q)
+def apply_relevance_model(queries: list[dict]) -> list[dict]:
+    """
+    Score keyword-relevant queries with the learned relevance model in one
+    batch and drop the ones unlikely to get a response. Queries pass
+    through unchanged when no model has been trained.
+    """
+    if not queries:
+        return queries
+    # Imported on first use so NumPy is only loaded once a digest has work
+    from relevance_model import get_relevance_model
 
-    return relevant
+    model = get_relevance_model()
+    if model is None:
+        return queries
+    probabilities = model.predict_proba([(q.get("title", ""), q.get("query", "")) for q in queries])
+    kept = []
+    for q, probability in zip(queries, probabilities):
+        q["response_probability"] = round(float(probability), 4)
+        if probability >= model.threshold:
+            kept.append(q)
+    incr("queries.model_filtered", len(queries) - len(kept))
+    return kept
@@ -0,0 +1,119 @@
+import re
+
+# A keyword may only start where the previous character is not a letter/digit
+_WORD_START = r"(?<![^\W_])"
+
+
+def _is_word_char(text: str, index: int) -> bool:
+    return index < len(text) and text[index].isalnum()
+
+
+def normalize_keywords(keywords) -> list[str]:
+    """
+    Lowercase, trim and de-duplicate a keyword list, keeping first-seen order.
+    Entries like "IT solutions" would otherwise never match lowercased text.
+    """
+    seen = set()
+    normalized = []
+    for keyword in keywords:
+        kw = " ".join(keyword.lower().split())
+        if kw and kw not in seen:
+            seen.add(kw)
+            normalized.append(kw)
+    return normalized
+
+
+def _trie_pattern(keywords: list[str]) -> str:
+    """
+    Build a regex alternation shaped like a trie, e.g. "energy(?: efficiency)?".
+    The regex engine then branches on one character at a time instead of
+    trying every keyword at every position.
+    """
+    trie = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end-of-keyword marker
+
+    def emit(node) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + emit(child)
+                    for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if terminal else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword occurring in a text in a single regex pass.
+
+    Keywords are normalized once at construction time and compiled into one
+    trie-shaped pattern. By default matching is case-insensitive substring
+    matching, i.e. the same semantics as `keyword in text.lower()`. With
+    `whole_words=True` a keyword only matches on word boundaries at both
+    ends, so "ai" no longer matches "said" and "bet" no longer matches "better".
+    """
+
+    def __init__(self, keywords, whole_words: bool = False):
+        self.keywords = normalize_keywords(keywords)
+        self.whole_words = whole_words
+        keyword_set = set(self.keywords)
+        # For each keyword, the shorter keywords that are prefixes of it.
+        # The regex reports only the longest keyword starting at a position,
+        # so "energy" is recovered from a match on "energy efficiency".
+        self._prefixes = {
+            kw: [kw[:i] for i in range(1, len(kw)) if kw[:i] in keyword_set]
+            for kw in self.keywords
+        }
+        if self.keywords:
+            pattern = _trie_pattern(self.keywords)
+            start = _WORD_START if whole_words else ""
+            # Zero-width lookahead so overlapping keywords are all reported
+            self._scan = re.compile(f"{start}(?=({pattern}))")
+            self._search = None if whole_words else re.compile(pattern)
+        else:
+            self._search = self._scan = None
+
+    def search(self, text: str) -> bool:
+        """
+        True as soon as any keyword is found (stops at the first hit).
+        """
+        if not text or self._scan is None:
+            return False
+        if self._search is not None:
+            return self._search.search(text.lower()) is not None
+        lower = text.lower()
+        return any(self._boundary_hits(lower, m) for m in self._scan.finditer(lower))
+
+    def find_all(self, text: str) -> set[str]:
+        """
+        Return the set of keywords that occur in `text`.
+        """
+        hits = set()
+        if not text or self._scan is None:
+            return hits
+        lower = text.lower()
+        for match in self._scan.finditer(lower):
+            if self.whole_words:
+                hits.update(self._boundary_hits(lower, match))
+            else:
+                longest = match.group(1)
+                hits.add(longest)
+                hits.update(self._prefixes[longest])
+        return hits
+
+    def _boundary_hits(self, lower: str, match) -> list[str]:
+        """
+        Keywords starting at `match` that also end on a word boundary.
+        """
+        start = match.start(1)
+        longest = match.group(1)
+        return [kw for kw in self._prefixes[longest] + [longest]
+                if not _is_word_char(lower, start + len(kw))]
@@ -0,0 +1,175 @@
+"""
+Body text of a HARO digest from a Gmail API message, in either "full"
+format (a JSON tree of MIME parts) or "raw" format (the RFC 822 source,
+parsed with the stdlib email parser).
+
+The MIME tree is walked without decoding any bodies. The best text part is
+picked by type and size, and only that part is decoded. text/plain wins
+unless it is missing or only a stub next to a much larger text/html part;
+HTML is converted to plain text.
+"""
+import base64
+import html
+import re
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+
+TEXT_TYPES = ("text/plain", "text/html")
+
+# A text/plain part smaller than this share of the text/html alternative is
+# taken for a "view this email in your browser" stub, and the HTML is used
+PLAIN_TEXT_MIN_RATIO = 0.05
+
+_CHARSET_RE = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+
+_HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_HTML_HIDDEN_RE = re.compile(r"<(script|style|head|title)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_MAILTO_RE = re.compile(r"""<a\b[^>]*?href\s*=\s*["']mailto:([^"'?>]+)[^>]*>(.*?)</a\s*>""",
+                             re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(
+    r"<br\s*/?>|</?(?:p|div|tr|li|h[1-6]|table|blockquote|ul|ol|pre|hr)\b[^>]*>", re.IGNORECASE)
+_HTML_CELL_RE = re.compile(r"</t[dh]\s*>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]*>")
+_SPACES_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _mailto_text(match) -> str:
+    # Keep the address of mailto links whose text does not show it, since
+    # HARO queries are answered at the address in the link
+    address, text = match.group(1), match.group(2)
+    return text if address.lower() in text.lower() else f"{text} ({address})"
+
+
+def html_to_text(markup: str) -> str:
+    """
+    Plain text of an HTML email: block elements become line breaks,
+    scripts, styles and other tags are dropped, entities are unescaped.
+    Regex passes only, so a digest of a few hundred KB converts in
+    milliseconds.
+    """
+    text = _HTML_COMMENT_RE.sub("", markup)
+    text = _HTML_HIDDEN_RE.sub("", text)
+    text = _HTML_MAILTO_RE.sub(_mailto_text, text)
+    text = _HTML_BREAK_RE.sub("\n", text)
+    text = _HTML_CELL_RE.sub(" ", text)
+    text = html.unescape(_HTML_TAG_RE.sub("", text))
+    text = _SPACES_RE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def choose_part(candidates):
+    """
+    Pick the part to read from (mime type, size, part) candidates: the
+    largest text/plain part, unless it is a stub next to the largest
+    text/html part. Returns (mime type, part), or None if there is no
+    non-empty text part.
+    """
+    largest = {}
+    for mime_type, size, part in candidates:
+        if size and size > largest.get(mime_type, (0, None))[0]:
+            largest[mime_type] = (size, part)
+    plain, rich = largest.get("text/plain"), largest.get("text/html")
+    if plain and (not rich or plain[0] >= rich[0] * PLAIN_TEXT_MIN_RATIO):
+        return "text/plain", plain[1]
+    if rich:
+        return "text/html", rich[1]
+    return None
+
+
+def _as_text(content: str, mime_type: str) -> str:
+    return html_to_text(content) if mime_type == "text/html" else content
+
+
+# ---------------------------------------------------------------- "full"
+
+def _part_header(part: dict, name: str) -> str:
+    for h in part.get("headers", []):
+        if h["name"].lower() == name.lower():
+            return h["value"]
+    return ""
+
+
+def _is_attachment(part: dict) -> bool:
+    disposition = _part_header(part, "Content-Disposition").lower()
+    return bool(part.get("filename")) or disposition.startswith("attachment")
+
+
+def _text_parts(payload: dict):
+    """
+    Leaf text parts of a Gmail payload in document order, at any depth.
+    """
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if part.get("parts"):
+            stack.extend(reversed(part["parts"]))
+        elif part.get("mimeType") in TEXT_TYPES and not _is_attachment(part):
+            yield part
+
+
+def _part_size(part: dict) -> int:
+    body = part.get("body", {})
+    return body.get("size") or len(body.get("data", ""))
+
+
+def _decode_bytes(raw: bytes, charset: str | None) -> str:
+    # Unknown or bogus charsets fall back to UTF-8
+    try:
+        return raw.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
+
+
+def _decode(data: str, charset: str | None) -> str:
+    return _decode_bytes(base64.urlsafe_b64decode(data), charset)
+
+
+def payload_text(payload: dict, fetch_attachment=None) -> tuple[str, str | None]:
+    """
+    (text, mime type of the part it came from) for a "full" format payload.
+    A chosen part whose body Gmail left out of the response (it then only
+    has an attachmentId) is downloaded with fetch_attachment(attachment_id),
+    if given.
+    """
+    chosen = choose_part((p["mimeType"], _part_size(p), p) for p in _text_parts(payload))
+    if chosen is None:
+        return "", None
+    mime_type, part = chosen
+    body = part.get("body", {})
+    data = body.get("data")
+    if data is None and body.get("attachmentId") and fetch_attachment:
+        data = fetch_attachment(body["attachmentId"])
+    if not data:
+        return "", mime_type
+    charset = _CHARSET_RE.search(_part_header(part, "Content-Type"))
+    return _as_text(_decode(data, charset and charset.group(1)), mime_type), mime_type
+
+
+# ----------------------------------------------------------------- "raw"
+
+def parse_raw(raw: str) -> EmailMessage:
+    """
+    Parse a "raw" format message (base64url RFC 822 source). Part bodies
+    stay encoded until read.
+    """
+    return BytesParser(policy=policy.default).parsebytes(base64.urlsafe_b64decode(raw))
+
+
+def message_text(message: EmailMessage) -> tuple[str, str | None]:
+    """
+    (text, mime type of the part it came from) for a parsed message.
+    Sizes are compared on the still-encoded payloads.
+    """
+    candidates = ((part.get_content_type(), len(part.get_payload()), part)
+                  for part in message.walk()
+                  if not part.is_multipart() and part.get_content_type() in TEXT_TYPES
+                  and not part.is_attachment())
+    chosen = choose_part(candidates)
+    if chosen is None:
+        return "", None
+    mime_type, part = chosen
+    content = _decode_bytes(part.get_payload(decode=True) or b"", part.get_content_charset())
+    return _as_text(content, mime_type), mime_type
@@ -1,4 +1,6 @@
 import os
+import signal
+import threading
 from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
@@ -7,21 +9,65 @@ print("🔄 Loading environment variables...")
 load_dotenv()
 print("✅ Environment loaded.")
 
-from gmail_client import get_gmail_service, fetch_haro_emails, mark_as_read, send_reply
-from haro_parser import parse_haro_email
-from pitch_generator import generate_pitch
-from sheets_client import log_pitch
+from gmail_client import (SEND_UNCONFIRMED, get_gmail_service, fetch_haro_emails,
+                          fetch_new_haro_emails, find_sent_message, save_sync_cursor,
+                          mark_as_read, build_reply, send_replies)
+from pipeline import generate_pitch_batches
+from pitch_generator import save_router_state
+from profiles import dedup_key, get_profile, route_haro_email
+from sheets_client import append_rows, build_row
+from completion_cache import get_completion_cache
+from dedup_index import get_dedup_index
+from metrics import incr, metrics
+from scheduler import schedule_queries
+from spool import get_spool
 
+GMAIL_USER = os.getenv("GMAIL_USER")
 
-load_dotenv()
+# Only HARO emails received within this many minutes are processed
+RECENT_WINDOW_MINUTES = 30
 
-GMAIL_USER = os.getenv("GMAIL_USER")
+# Process every fresh digest in a run ("false": only the newest one)
+MULTI_DIGEST = os.getenv("HARO_MULTI_DIGEST", "true").lower() == "true"
+
+# "search" looks for unread HARO emails; "history" syncs incrementally from a
+# saved Gmail historyId and does not depend on read state
+GMAIL_SYNC_MODE = os.getenv("GMAIL_SYNC_MODE", "search")
+
+# History sync moves its cursor past every digest it fetched, so digests
+# skipped by single-digest mode would never be seen again
+if GMAIL_SYNC_MODE == "history" and not MULTI_DIGEST:
+    raise SystemExit("❌ GMAIL_SYNC_MODE=history requires HARO_MULTI_DIGEST=true.")
 
 # Pakistan Time is UTC+5
 PAKISTAN_TIMEZONE = timezone(timedelta(hours=5))
 
+# Daemon mode polls every DAEMON_MIN_POLL_SECONDS after finding mail and
+# backs off towards DAEMON_MAX_POLL_SECONDS while the mailbox stays quiet
+DAEMON_MIN_POLL_SECONDS = int(os.getenv("DAEMON_MIN_POLL_SECONDS", "20"))
+DAEMON_MAX_POLL_SECONDS = int(os.getenv("DAEMON_MAX_POLL_SECONDS", "120"))
+
+# Set by SIGTERM/SIGINT to stop the daemon loop after the current run
+_stop_event = threading.Event()
+
+# Gmail service kept warm across daemon runs
+_gmail_service = None
 
-def is_within_processing_window() -> bool:
+
+def _processing_windows(current_hour: int) -> tuple[bool, bool, bool]:
+    # Window 1: 2 PM - 5 PM (14:00 - 17:00) Pakistan Time
+    window1 = 14 <= current_hour < 17
+    
+    # Window 2: 9 PM - 12 AM (21:00 - 00:00) Pakistan Time
+    window2 = 21 <= current_hour <= 23 or current_hour == 0  # Hours 21 (9 PM), 22 (10 PM), 23 (11 PM), and 0 (12 AM)
+    
+    # Window 3: 2 AM - 5 AM (02:00 - 05:00) Pakistan Time
+    window3 = 2 <= current_hour < 5
+
+    return window1, window2, window3
+
+
+def is_within_processing_window(verbose: bool = True) -> bool:
     """
     Check if current time is within processing windows (Pakistan Time):
     - Window 1: 2 PM - 5 PM (14:00 - 17:00)
@@ -32,24 +78,33 @@ def is_within_processing_window() -> bool:
     now_utc = datetime.now(timezone.utc)
     now_pakistan = now_utc.astimezone(PAKISTAN_TIMEZONE)
     current_hour = now_pakistan.hour
-    
-    print(f"🕒 Current Pakistan Time: {now_pakistan.strftime('%Y-%m-%d %H:%M:%S')} (Hour: {current_hour})")
-    
-    # Window 1: 2 PM - 5 PM (14:00 - 17:00) Pakistan Time
-    window1 = 14 <= current_hour < 17
-    
-    # Window 2: 9 PM - 12 AM (21:00 - 00:00) Pakistan Time
-    window2 = 21 <= current_hour <= 23 or current_hour == 0  # Hours 21 (9 PM), 22 (10 PM), 23 (11 PM), and 0 (12 AM)
-    
-    # Window 3: 2 AM - 5 AM (02:00 - 05:00) Pakistan Time
-    window3 = 2 <= current_hour < 5
-    
+
+    window1, window2, window3 = _processing_windows(current_hour)
     in_window = window1 or window2 or window3
+    if not verbose:
+        return in_window
+
+    print(f"🕒 Current Pakistan Time: {now_pakistan.strftime('%Y-%m-%d %H:%M:%S')} (Hour: {current_hour})")
     print(f"⏰ In processing window: {in_window} (Window1: {window1}, Window2: {window2}, Window3: {window3})")
     
     return in_window
 
 
+def seconds_until_next_window() -> float:
+    """
+    Seconds from now until the next processing window opens (0 if inside one).
+    """
+    now = datetime.now(timezone.utc).astimezone(PAKISTAN_TIMEZONE)
+    if any(_processing_windows(now.hour)):
+        return 0.0
+    hour_start = now.replace(minute=0, second=0, microsecond=0)
+    for hours_ahead in range(1, 25):
+        candidate = hour_start + timedelta(hours=hours_ahead)
+        if any(_processing_windows(candidate.hour)):
+            return (candidate - now).total_seconds()
+    return 3600.0
+
+
 def is_recent_email(ts: datetime, window_minutes: int = 30) -> bool:
     """
     Checks if email timestamp is within last `window_minutes` minutes (UTC).
@@ -61,71 +116,295 @@ def is_recent_email(ts: datetime, window_minutes: int = 30) -> bool:
     return delta <= timedelta(minutes=window_minutes)
 
 
-def process_haro_once(force_run: bool = False):
+def get_service():
+    """
+    Gmail service, built once per process and reused by daemon runs.
+    """
+    global _gmail_service
+    if _gmail_service is None:
+        print("🔗 Connecting to Gmail API...")
+        _gmail_service = get_gmail_service()
+        print("✅ Connected to Gmail.")
+    return _gmail_service
+
+
+def process_haro_once(force_run: bool = False, service=None) -> int:
+    """
+    One polling pass. Returns the number of fresh HARO emails found.
+    `service` overrides the Gmail service (the warm one is used by default).
+    """
     print("🚀 Starting HARO processing...")
     # Check if we're within processing time window (Pakistan Time)
     if not force_run and not is_within_processing_window():
         now_pakistan = datetime.now(timezone.utc).astimezone(PAKISTAN_TIMEZONE)
         print(f"⏰ Outside processing window. Current Pakistan Time: {now_pakistan.strftime('%H:%M:%S')}")
         print("   Processing windows: 2-5 PM, 9 PM-12 AM, and 2-5 AM Pakistan Time")
-        return
+        return 0
     
     print("🔍 Checking for HARO emails...")
-    print("🔗 Connecting to Gmail API...")
-    service = get_gmail_service()
-    print("✅ Connected to Gmail.")
-    emails = fetch_haro_emails(service)
+    metrics.reset()
+    try:
+        service = service or get_service()
 
-    if not emails:
-        print("❌ No unread HARO emails found.")
-        return
+        if GMAIL_SYNC_MODE == "history":
+            emails, history_id = fetch_new_haro_emails(service, max_age_minutes=RECENT_WINDOW_MINUTES)
+            process_emails(service, emails)
+            # Advance the cursor only after the emails were handled
+            if history_id:
+                save_sync_cursor(history_id)
+        else:
+            emails = fetch_haro_emails(service, max_age_minutes=RECENT_WINDOW_MINUTES)
+            process_emails(service, emails)
+        incr("emails.fetched", len(emails))
+        return len(emails)
+    finally:
+        report = metrics.write_report()
+        print(f"📈 Run finished in {report['duration_s']:.1f}s: {report['counters']}")
 
-    # HARO sends only one per edition, but we'll be safe and sort by timestamp (newest first)
-    emails.sort(key=lambda e: e["timestamp"] or datetime.min.replace(tzinfo=timezone.utc),
-                reverse=True)
 
-    for email in emails:
-        ts = email["timestamp"]
+def _request_stop(signum, frame):
+    print(f"🛑 Received signal {signum}, stopping after the current run...")
+    _stop_event.set()
+
 
-        if not is_recent_email(ts, window_minutes=30):
-            print("⏩ Skipping HARO email older than 30 minutes.")
+def run_daemon(force_run: bool = False):
+    """
+    Long-running alternative to the cron: Gmail, Groq and Sheets clients stay
+    warm between polls. Polls on an adaptive interval inside the processing
+    windows and sleeps until the next window outside them. Exits cleanly on
+    SIGTERM or SIGINT.
+    """
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    print("👀 HARO daemon started.")
+
+    interval = DAEMON_MIN_POLL_SECONDS
+    while not _stop_event.is_set():
+        wait = 0.0 if force_run else seconds_until_next_window()
+        if wait > 0:
+            print(f"😴 Outside processing window. Sleeping {wait / 60:.0f} minutes.")
+            _stop_event.wait(wait)
+            interval = DAEMON_MIN_POLL_SECONDS
             continue
 
-        print(f"✅ Found recent HARO email: {email['subject']} at {ts}")
+        try:
+            found = process_haro_once(force_run=True)
+        except Exception as e:
+            print(f"❌ HARO run failed: {type(e).__name__}: {e}")
+            found = 0
+
+        # Poll quickly while digests are arriving, back off while quiet
+        if found:
+            interval = DAEMON_MIN_POLL_SECONDS
+        else:
+            interval = min(interval * 1.5, DAEMON_MAX_POLL_SECONDS)
+        _stop_event.wait(interval)
+
+    print("👋 HARO daemon stopped.")
+
+
+def process_emails(service, emails: list[dict]):
+    try:
+        _settle_unconfirmed_sends(service, get_spool())
+        _process_emails(service, emails)
+    finally:
+        # Sheets logging is off the send path: rows from this run and any
+        # left over from earlier runs are written in bulk from the spool
+        get_spool().drain_log_rows(append_rows)
+        save_router_state()
 
-        # Parse & filter relevant queries
-        queries = parse_haro_email(email["body"])
+
+def _collect_queries(emails: list[dict], carried: list[tuple[dict, dict]] = ()) -> list[tuple[dict, dict]]:
+    """
+    Parse each digest and return (email, query) pairs to pitch, one per
+    profile a query was routed to, followed by the `carried` pairs deferred
+    by earlier runs. A query that HARO re-sent in several digests is kept
+    only once per profile, from the newest digest, and queries a profile
+    already pitched in an earlier run are dropped.
+    """
+    pitched_before = get_dedup_index()
+    seen = set()
+    work = []
+
+    def add(email, q):
+        fingerprint = dedup_key(q)
+        if fingerprint in seen:
+            incr("queries.duplicate")
+            return
+        if fingerprint in pitched_before:
+            print(f"⏩ Already pitched in an earlier run: {q['title'][:50]}...")
+            incr("queries.already_pitched")
+            return
+        seen.add(fingerprint)
+        work.append((email, q))
+
+    for email in emails:
+        print(f"✅ Found recent HARO email: {email['subject']} at {email['timestamp']}")
+
+        # Parse once & route relevant queries to every matching profile
+        queries = route_haro_email(email["body"], received_at=email["timestamp"])
 
         if not queries:
             print("⚠️ HARO email has no relevant queries based on niche filter.")
-            mark_as_read(service, email["id"])
-            return
 
-        # For now, process all relevant queries inside the same HARO email
         for q in queries:
-            pitch = generate_pitch(q)
             # Get reply-to address from the query (extracted from each query block)
-            reply_to = q.get("reply_to")
-            if not reply_to:
+            if not q.get("reply_to"):
                 print(f"⚠️ No reply-to address found for query: {q['title'][:50]}...")
                 print("   Skipping this query.")
                 continue
-            
-            send_reply(service, email["threadId"], email["subject"], pitch, reply_to, GMAIL_USER)
+            add(email, q)
+
+    for email, q in carried:
+        add(email, q)
+    return work
+
+
+def _process_emails(service, emails: list[dict]):
+    spool = get_spool()
+    carried = spool.deferred_queries()
+    if not emails and not carried:
+        print(f"❌ No unread HARO emails within the last {RECENT_WINDOW_MINUTES} minutes.")
+        return
+
+    # Sort by timestamp (newest first)
+    emails.sort(key=lambda e: e["timestamp"] or datetime.min.replace(tzinfo=timezone.utc),
+                reverse=True)
+
+    fresh = []
+    for email in emails:
+        if not is_recent_email(email["timestamp"], window_minutes=RECENT_WINDOW_MINUTES):
+            print(f"⏩ Skipping HARO email older than {RECENT_WINDOW_MINUTES} minutes.")
+            continue
+        fresh.append(email)
+
+    if not fresh and not carried:
+        print(f"❌ No HARO emails within the last {RECENT_WINDOW_MINUTES} minutes.")
+        return
+
+    if not MULTI_DIGEST:
+        fresh = fresh[:1]
+    if carried:
+        print(f"📥 {len(carried)} queries deferred by earlier runs.")
+
+    # Most urgent queries first, expired ones dropped, capped at the run
+    # budget; the rest wait in the spool for a later run, so digests can
+    # still be marked read once their scheduled queries are handled
+    work, deferred = schedule_queries(_collect_queries(fresh, carried),
+                                      query_of=lambda item: item[1])
+    spool.defer_queries([(dedup_key(q), email, q) for email, q in deferred])
+    # Carried queries that expired or were pitched meanwhile are done with;
+    # scheduled ones stay in the spool until they have been handled
+    pending = {dedup_key(q) for _, q in work + deferred}
+    spool.forget_deferred([dedup_key(q) for _, q in carried if dedup_key(q) not in pending])
+
+    # Scheduled queries left to handle per fresh digest; a digest is marked
+    # read after its last one
+    remaining = {email["id"]: 0 for email in fresh}
+    for email, _ in work:
+        if email["id"] in remaining:
+            remaining[email["id"]] += 1
+    for email in fresh:
+        if not remaining[email["id"]]:
+            # Nothing to pitch in this digest now
+            mark_as_read(service, email["id"])
+
+    # Pitches for all relevant queries of all digests are generated
+    # concurrently in priority order; whatever is ready is sent together in
+    # one Gmail batch and logged in that order
+    emails_of = iter(email for email, _ in work)
+    for ready in generate_pitch_batches([q for _, q in work]):
+        batch = [(next(emails_of), q, pitch) for q, pitch in ready]
+        _send_pitches(service, spool, batch)
+        spool.forget_deferred([dedup_key(q) for _, q, _ in batch])
+
+        for email, _, _ in batch:
+            if email["id"] not in remaining:
+                continue
+            remaining[email["id"]] -= 1
+            if not remaining[email["id"]]:
+                # Mark the HARO email as read so it is never processed again
+                mark_as_read(service, email["id"])
+                print(f"✅ Marked HARO email as read: {email['subject']}")
 
-            log_pitch(q, pitch, status="Sent")
-            print(f"✅ Pitch sent for: {q['title']}")
 
-        # Mark the HARO email as read so it is never processed again
-        mark_as_read(service, email["id"])
-        print("✅ Marked HARO email as read. Stopping until next window.")
+def _record_send(spool, entry_id: int, q: dict, pitch: str, message: dict, send_id):
+    if send_id is SEND_UNCONFIRMED:
+        # Settled by a later run; counted as pitched meanwhile, so the
+        # query is not pitched again from another digest
+        spool.record_unconfirmed(entry_id, message)
+        get_dedup_index().add(dedup_key(q))
+        incr("pitches.send_unconfirmed")
+        print(f"❔ Send not confirmed, checking again next run: {q['title'][:50]}...")
         return
 
-    print("❌ No HARO emails within the last 30 minutes.")
+    spool.record_send(entry_id, send_id)
+    spool.queue_log_row(entry_id, build_row(q, pitch, status="Sent" if send_id else "Send failed"))
+
+    if send_id:
+        get_dedup_index().add(dedup_key(q))
+        incr("pitches.sent")
+        print(f"✅ Pitch sent for: {q['title']}")
+    else:
+        incr("pitches.send_failed")
+
+
+def _send_pitches(service, spool, batch: list[tuple[dict, dict, str | None]]):
+    outgoing = []
+    for email, q, pitch in batch:
+        if not pitch:
+            incr("pitches.failed")
+            continue
+        incr("queries.pitched")
+        # Record the pitch before sending and the outcome right after, so
+        # nothing is lost if this run dies before Sheets is updated
+        entry_id = spool.record_pitch(q, pitch, email["id"])
+        sender = get_profile(q.get("profile")).sender or GMAIL_USER
+        outgoing.append((entry_id, q, pitch, build_reply(email, pitch, q["reply_to"], sender)))
+    if not outgoing:
+        return
+
+    send_ids = send_replies(service, [message for *_, message in outgoing])
+    for (entry_id, q, pitch, message), send_id in zip(outgoing, send_ids):
+        _record_send(spool, entry_id, q, pitch, message, send_id)
+
+
+def _settle_unconfirmed_sends(service, spool):
+    """
+    Pitches whose Gmail batch failed in transit in an earlier run: the ones
+    that reached Gmail are recorded as sent, the others are sent again.
+    """
+    entries = spool.unconfirmed_sends()
+    if not entries:
+        return
+    print(f"🔁 Checking {len(entries)} pitch(es) whose send was not confirmed...")
+    resend = []
+    for entry_id, q, pitch, message in entries:
+        try:
+            send_id = find_sent_message(service, message)
+        except Exception as e:
+            # Still unknown; resending now could send it twice
+            print(f"⚠️ Could not check an unconfirmed send, leaving it for later: {e}")
+            continue
+        if send_id:
+            _record_send(spool, entry_id, q, pitch, message, send_id)
+        else:
+            resend.append((entry_id, q, pitch, message))
+
+    if resend:
+        send_ids = send_replies(service, [message for *_, message in resend])
+        for (entry_id, q, pitch, message), send_id in zip(resend, send_ids):
+            _record_send(spool, entry_id, q, pitch, message, send_id)
 
 
 if __name__ == "__main__":
     import sys
-    force = len(sys.argv) > 1 and sys.argv[1] == "--force"
-    # No loops here; GitHub Actions will call this every 15 minutes in your windows
-    process_haro_once(force_run=force)
+    force = "--force" in sys.argv[1:]
+    if "--fresh" in sys.argv[1:] and get_completion_cache():
+        # Ask Groq again even for prompts it has answered before
+        get_completion_cache().bypass = True
+    if "--daemon" in sys.argv[1:]:
+        run_daemon(force_run=force)
+    else:
+        # No loops here; GitHub Actions will call this every 15 minutes in your windows
+        process_haro_once(force_run=force)
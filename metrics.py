@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Where the end-of-run JSON report is written ("" disables it)
+RUN_REPORT_PATH = os.getenv("HARO_RUN_REPORT", "haro_run_report.json")
+
+# Optional node_exporter textfile collector output, e.g.
+# /var/lib/node_exporter/textfile/haro.prom
+PROMETHEUS_TEXTFILE = os.getenv("HARO_PROMETHEUS_TEXTFILE", "")
+
+
+def _label_key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+
+
+class RunMetrics:
+    """
+    Timing spans, counters and Groq token usage for one run.
+
+    Thread-safe, so pitch workers can record into the same instance.
+    Spans are keyed by name plus optional labels (e.g. the Groq model).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+            self.spans = {}
+            self.counters = {}
+            self.tokens = {}
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """
+        Time the enclosed block. Failed blocks are counted separately.
+        """
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            key = _label_key(name, labels)
+            with self._lock:
+                entry = self.spans.setdefault(
+                    key, {"name": name, "labels": labels, "count": 0,
+                          "errors": 0, "total_s": 0.0, "max_s": 0.0}
+                )
+                entry["count"] += 1
+                entry["errors"] += failed
+                entry["total_s"] += elapsed
+                entry["max_s"] = max(entry["max_s"], elapsed)
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_usage(self, model: str, usage):
+        """
+        Add token usage from a Groq response's `usage` object.
+        """
+        if usage is None:
+            return
+        with self._lock:
+            totals = self.tokens.setdefault(model, {"prompt": 0, "completion": 0, "total": 0})
+            totals["prompt"] += getattr(usage, "prompt_tokens", 0) or 0
+            totals["completion"] += getattr(usage, "completion_tokens", 0) or 0
+            totals["total"] += getattr(usage, "total_tokens", 0) or 0
+
+    def report(self) -> dict:
+        with self._lock:
+            spans = {
+                key: {**entry, "total_s": round(entry["total_s"], 4),
+                      "max_s": round(entry["max_s"], 4)}
+                for key, entry in self.spans.items()
+            }
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at, tz=timezone.utc).isoformat(),
+                "duration_s": round(time.perf_counter() - self._start, 4),
+                "spans": spans,
+                "counters": dict(self.counters),
+                "tokens": {model: dict(t) for model, t in self.tokens.items()},
+            }
+
+    def prometheus_text(self, report: dict | None = None) -> str:
+        report = report or self.report()
+        lines = [
+            "# HELP haro_run_duration_seconds Duration of the last HARO run.",
+            "# TYPE haro_run_duration_seconds gauge",
+            f"haro_run_duration_seconds {report['duration_s']}",
+            "# HELP haro_run_timestamp_seconds Start time of the last HARO run.",
+            "# TYPE haro_run_timestamp_seconds gauge",
+            f"haro_run_timestamp_seconds {int(self.started_at)}",
+            "# HELP haro_span_seconds Time spent per operation in the last run.",
+            "# TYPE haro_span_seconds summary",
+        ]
+        span_labels = [
+            (",".join(f'{k}="{v}"' for k, v in {"span": e["name"], **e["labels"]}.items()), e)
+            for e in report["spans"].values()
+        ]
+        for label_text, entry in span_labels:
+            lines.append(f"haro_span_seconds_sum{{{label_text}}} {entry['total_s']}")
+            lines.append(f"haro_span_seconds_count{{{label_text}}} {entry['count']}")
+        lines += [
+            "# HELP haro_span_errors Failed operations per span in the last run.",
+            "# TYPE haro_span_errors gauge",
+        ]
+        for label_text, entry in span_labels:
+            lines.append(f"haro_span_errors{{{label_text}}} {entry['errors']}")
+        lines += [
+            "# HELP haro_events Events counted in the last run.",
+            "# TYPE haro_events gauge",
+        ]
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f'haro_events{{event="{name}"}} {value}')
+        lines += [
+            "# HELP haro_llm_tokens Groq tokens used in the last run.",
+            "# TYPE haro_llm_tokens gauge",
+        ]
+        for model, totals in sorted(report["tokens"].items()):
+            for kind, value in totals.items():
+                lines.append(f'haro_llm_tokens{{model="{model}",kind="{kind}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str | None = None, prometheus_path: str | None = None) -> dict:
+        """
+        Write the JSON report and, if configured, the Prometheus textfile.
+        Both are written to a temp file and renamed so readers never see a
+        partial file.
+        """
+        report = self.report()
+        path = RUN_REPORT_PATH if path is None else path
+        prometheus_path = PROMETHEUS_TEXTFILE if prometheus_path is None else prometheus_path
+        try:
+            if path:
+                _write_atomic(path, json.dumps(report, indent=2))
+            if prometheus_path:
+                _write_atomic(prometheus_path, self.prometheus_text(report))
+        except OSError as e:
+            print(f"⚠️ Failed to write run report: {e}")
+        return report
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Metrics for the current run
+metrics = RunMetrics()
+span = metrics.span
+incr = metrics.incr
@@ -0,0 +1,251 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import incr
+
+# Per-call timeouts in seconds; a stalled 70B call should not hold a query
+# for the SDK's default of several minutes
+MODEL_TIMEOUTS = {
+    "llama-3.3-70b-versatile": float(os.getenv("GROQ_TIMEOUT_70B", "20")),
+    "llama-3.1-8b-instant": float(os.getenv("GROQ_TIMEOUT_8B", "10")),
+}
+DEFAULT_TIMEOUT = float(os.getenv("GROQ_TIMEOUT_DEFAULT", "20"))
+
+# The primary model is skipped for CIRCUIT_COOLDOWN_SECONDS after
+# CIRCUIT_FAILURE_THRESHOLD consecutive failures
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "120"))
+
+# "true": when a primary call runs longer than HEDGE_PERCENTILE of recent
+# primary latencies, also send the request to the fallback model and use
+# whichever answers first
+HEDGE_REQUESTS = os.getenv("GROQ_HEDGE_REQUESTS", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("GROQ_HEDGE_PERCENTILE", "90"))
+HEDGE_MIN_SAMPLES = 5
+
+# Circuit state and primary latencies are carried from one cron run to the
+# next in this file, so a run starts with what the previous one learned
+ROUTER_STATE_FILE = os.getenv("GROQ_ROUTER_STATE_FILE", ".groq_router_state.json")
+
+
+def model_timeout(model: str) -> float:
+    return MODEL_TIMEOUTS.get(model, DEFAULT_TIMEOUT)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and stays open for
+    `cooldown_seconds`. After the cooldown one trial call is let through;
+    its outcome closes the circuit again or restarts the cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.cooldown_seconds:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            trial = self._trial_running
+            self._trial_running = False
+            if trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+                print(f"🔌 Circuit opened for {self.cooldown_seconds:.0f}s after "
+                      f"{self._failures} failures")
+                self._opened_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        """
+        Failure count and, while open, the wall-clock time the circuit opened.
+        """
+        with self._lock:
+            opened_at = None
+            if self._opened_at is not None:
+                opened_at = time.time() - (time.monotonic() - self._opened_at)
+            return {"failures": self._failures, "opened_at": opened_at}
+
+    def restore(self, state: dict):
+        """
+        Resume from `to_dict` output saved by an earlier process. An open
+        circuit whose cooldown has passed lets one trial call through, as if
+        the process had kept running.
+        """
+        with self._lock:
+            self._failures = int(state.get("failures", 0))
+            opened_at = state.get("opened_at")
+            self._opened_at = (None if opened_at is None
+                               else time.monotonic() - (time.time() - opened_at))
+            self._trial_running = False
+
+
+class LatencyTracker:
+    """
+    Latencies of the last `window` successful calls, for percentile lookups.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def samples(self) -> list[float]:
+        with self._lock:
+            return list(self._samples)
+
+    def restore(self, samples: list[float]):
+        with self._lock:
+            self._samples.extend(float(s) for s in samples)
+
+    def percentile(self, pct: float, min_samples: int = HEDGE_MIN_SAMPLES) -> float | None:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class ModelRouter:
+    """
+    Sends a completion to the primary model and falls back to the secondary
+    one. Every call gets the model's timeout, the primary model sits behind
+    a circuit breaker, and optionally slow primary calls are hedged with a
+    request to the fallback model.
+
+    `complete_fn(model=..., messages=..., timeout=..., **kwargs)` performs
+    one completion; `build_messages(model)` returns the prompt for a model.
+    With a `state_path`, circuit state and latency samples are loaded from
+    it and written back by save_state.
+    """
+
+    def __init__(self, primary: str, fallback: str, complete_fn,
+                 breaker: CircuitBreaker | None = None, hedge: bool = HEDGE_REQUESTS,
+                 hedge_percentile: float = HEDGE_PERCENTILE, state_path: str | None = None):
+        self.primary = primary
+        self.fallback = fallback
+        self.complete_fn = complete_fn
+        self.breaker = breaker or CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN_SECONDS)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.latency = LatencyTracker()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.state_path = state_path
+        self._used = False
+        if state_path:
+            self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.breaker.restore(state.get("breaker", {}))
+            self.latency.restore(state.get("latencies", []))
+        except (OSError, ValueError, TypeError, AttributeError):
+            return
+
+    def save_state(self):
+        """
+        Write circuit state and latency samples to `state_path`, if the
+        router made any calls. Failures are reported, not raised.
+        """
+        if not self.state_path or not self._used:
+            return
+        state = {"breaker": self.breaker.to_dict(), "latencies": self.latency.samples()}
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"⚠️ Failed to save model router state: {e}")
+
+    def _call(self, model: str, build_messages, kwargs: dict):
+        return self.complete_fn(model=model, messages=build_messages(model),
+                                timeout=model_timeout(model), **kwargs)
+
+    def _call_primary(self, build_messages, kwargs: dict):
+        start = time.perf_counter()
+        try:
+            response = self._call(self.primary, build_messages, kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        # Cache hits say nothing about the model's latency
+        if not getattr(response, "cached", False):
+            self.latency.record(time.perf_counter() - start)
+        return response
+
+    def _call_fallback(self, build_messages, kwargs: dict, reason):
+        print(f"⚠️ {self.primary} unavailable, switching to {self.fallback}: {reason}")
+        incr("groq.fallbacks")
+        return self._call(self.fallback, build_messages, kwargs)
+
+    def complete(self, build_messages, **kwargs):
+        self._used = True
+        if not self.breaker.allow():
+            incr("groq.circuit_open")
+            return self._call_fallback(build_messages, kwargs, "circuit open")
+
+        hedge_after = self.latency.percentile(self.hedge_percentile) if self.hedge else None
+        if hedge_after is None:
+            try:
+                return self._call_primary(build_messages, kwargs)
+            except Exception as e:
+                return self._call_fallback(build_messages, kwargs, e)
+        return self._complete_hedged(build_messages, kwargs, hedge_after)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="groq-hedge")
+            return self._executor
+
+    def _complete_hedged(self, build_messages, kwargs: dict, hedge_after: float):
+        pool = self._pool()
+        primary = pool.submit(self._call_primary, build_messages, kwargs)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done and primary.exception() is None:
+            return primary.result()
+        if done:
+            return self._call_fallback(build_messages, kwargs, primary.exception())
+
+        incr("groq.hedged")
+        hedge = pool.submit(self._call, self.fallback, build_messages, kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        incr("groq.hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
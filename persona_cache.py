@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PERSONA_CACHE_FILE = os.getenv("PERSONA_CACHE_FILE", ".persona_cache.json")
+PERSONA_CACHE_TTL_HOURS = float(os.getenv("PERSONA_CACHE_TTL_HOURS", "168"))
+PERSONA_CACHE_MAX_ENTRIES = int(os.getenv("PERSONA_CACHE_MAX_ENTRIES", "64"))
+
+
+class PersonaCache:
+    """
+    Persistent persona cache keyed by niche, with TTL expiry and LRU eviction.
+
+    Entries live in a small JSON file so personas survive between cron runs.
+    The file is rewritten atomically after every change. Safe to share
+    between pitch worker threads.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> OrderedDict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return OrderedDict()
+        # Stored oldest-used first, so file order is the LRU order
+        return OrderedDict((e["key"], e) for e in data if "key" in e and "persona" in e)
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.values()), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Failed to save persona cache: {e}")
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self._save()
+                return None
+            self._entries.move_to_end(key)
+            return dict(entry["persona"])
+
+    def put(self, key: str, persona: dict):
+        with self._lock:
+            self._entries[key] = {"key": key, "persona": persona, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+
+persona_cache = PersonaCache(
+    PERSONA_CACHE_FILE,
+    ttl_seconds=PERSONA_CACHE_TTL_HOURS * 3600,
+    max_entries=PERSONA_CACHE_MAX_ENTRIES,
+)
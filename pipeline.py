@@ -0,0 +1,38 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from pitch_generator import generate_pitch
+
+# Number of queries whose pitches are generated at the same time
+PITCH_WORKERS = int(os.getenv("PITCH_WORKERS", "4"))
+
+
+def _result(q: dict, future) -> tuple[dict, str | None]:
+    try:
+        return q, future.result()
+    except Exception as e:
+        print(f"❌ Failed to generate pitch for: {q.get('title', '')[:50]}... ({e})")
+        return q, None
+
+
+def generate_pitch_batches(queries, workers: int | None = None):
+    """
+    Generate pitches for `queries` on a bounded thread pool and yield lists
+    of (query, pitch) pairs in the original query order: the next pitch
+    together with every following one that is already done. While the
+    caller is busy (e.g. sending the previous batch) ready pitches pile up
+    and are handed over together, so they can be sent in one Gmail batch
+    request. Groq requests from all workers share the rate limiter in
+    pitch_generator. A query whose generation fails yields pitch=None.
+    """
+    workers = workers or PITCH_WORKERS
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pitch") as pool:
+        submitted = [(q, pool.submit(generate_pitch, q)) for q in queries]
+        i = 0
+        while i < len(submitted):
+            batch = [_result(*submitted[i])]
+            i += 1
+            while i < len(submitted) and submitted[i][1].done():
+                batch.append(_result(*submitted[i]))
+                i += 1
+            yield batch
@@ -0,0 +1,73 @@
+import re
+
+# Citations of figures or research the model cannot have: "42% of
+# homeowners", "3 out of 4", "a 2023 survey", "studies show 60% ...".
+# Percentages and research mentions on their own ("100% renewable energy",
+# "research shows founders burn out") are ordinary phrasing, not citations.
+_STATISTIC_RE = re.compile(
+    r"\b\d+(?:\.\d+)?\s*(?:%|percent\b|per cent\b)\s+of\b"
+    r"|\b\d{1,2}\s+(?:out of|in)\s+(?:\d{1,3}|ten|a hundred)\b(?!\.\d)"
+    r"|\ba\s+(?:\d{4}|recent)\s+(?:study|survey|report|poll)\b"
+    r"|\baccording to (?:a|one|recent|the latest)\s+(?:\w+\s+){0,2}(?:study|survey|report|poll)\b"
+    r"|\b(?:studies|research|data|surveys?)\s+(?:show|shows|found|finds|suggests?|indicates?)\b[^.!?\n]*?\d",
+    re.IGNORECASE,
+)
+
+# Characters a complete pitch body may end with
+_SENTENCE_END = (".", "!", "?", '"', "'", ")", "”", "’")
+
+
+def invented_statistics(text: str) -> list[str]:
+    """
+    Statistics citations found in `text`, e.g. ["42% of", "a 2023 survey"].
+    """
+    return [m.group(0) for m in _STATISTIC_RE.finditer(text or "")]
+
+
+def _is_website_line(line: str, website: str) -> bool:
+    return line.strip().rstrip("/").lower() == website.rstrip("/").lower()
+
+
+def signature_complete(text: str, website: str) -> bool:
+    """
+    True once `text` contains a finished line that is just the website, i.e.
+    the last line of the signature. Used to stop a stream at the signature.
+    """
+    lines = text.split("\n")
+    # The last line may still be growing, so only finished lines count
+    return any(_is_website_line(line, website) for line in lines[:-1])
+
+
+def trim_after_signature(text: str, website: str) -> str:
+    """
+    Drop anything the model wrote after the signature's website line.
+    """
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        if _is_website_line(line, website):
+            return "\n".join(lines[:i + 1])
+    return text
+
+
+def pitch_body(text: str, persona: dict) -> str:
+    """
+    The pitch without its signature block (everything from the persona's
+    name line onwards, if the signature is there).
+    """
+    lines = text.rstrip().split("\n")
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i].strip() == persona["name"] and i >= len(lines) - 4:
+            return "\n".join(lines[:i]).rstrip()
+    return text.rstrip()
+
+
+def is_truncated(text: str, persona: dict) -> bool:
+    """
+    True if the pitch body stops mid-sentence.
+    """
+    body = pitch_body(text, persona)
+    # Sign-offs like "Best," end the body without a full stop
+    last_line = body.rstrip().split("\n")[-1].strip() if body.strip() else ""
+    if last_line.endswith(",") and len(last_line.split()) <= 3:
+        body = body.rstrip()[:-len(last_line)].rstrip()
+    return not body.endswith(_SENTENCE_END)
@@ -1,112 +1,243 @@
 import json
 import os
-from dotenv import load_dotenv
-from groq import Groq
+import random
+import threading
+import time
+from functools import lru_cache
+from types import SimpleNamespace
 
-load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+from completion_cache import completion_key, get_completion_cache
+from metrics import incr, metrics, span
+from model_router import ROUTER_STATE_FILE, ModelRouter
+from persona_cache import persona_cache
+from profiles import DEFAULT_PROFILE, get_profile
+from pitch_checks import (invented_statistics, is_truncated, signature_complete,
+                          trim_after_signature)
+from prompt_builder import build_messages, fit_to_tokens
 
+# Groq client, created on the first completion (see get_groq_client)
+client = None
+_client_lock = threading.Lock()
 
-def load_persona(path="persona.json"):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
 
+def get_groq_client():
+    """
+    Return the Groq client, creating it on first use so that runs without
+    work never import the SDK or need GROQ_API_KEY.
+    """
+    global client
+    with _client_lock:
+        if client is None:
+            from groq import Groq
+            # The SDK's own retries would repeat a timed-out call before the
+            # model router gets to fall back; 429s are retried in
+            # _chat_completion instead
+            client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+        return client
 
-BASE_PERSONA = load_persona()
 
+def set_groq_client(new_client):
+    """
+    Replace the Groq client used for all completions, e.g. with an offline
+    stand-in that has the same chat.completions.create interface. Pass None
+    to go back to the real client.
+    """
+    global client
+    client = new_client
 
-def truncate_text(text: str, max_chars: int = 3500) -> str:
-    if not text:
-        return ""
-    if len(text) <= max_chars:
-        return text
-    return text[:max_chars] + "\n\n...[TRUNCATED]..."
+# Groq's per-model request limit; shared by all pitch workers
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+RATE_LIMIT_RETRIES = 3
+# Exponential backoff for 429s: 1s, 2s, 4s, ... capped, with jitter
+RATE_LIMIT_BASE_DELAY = 1.0
+RATE_LIMIT_MAX_DELAY = 30.0
 
+# Replies that finished normally (or were stopped at the signature); drafts
+# rejected mid-stream or cut off at max_tokens are never cached
+CACHEABLE_FINISH_REASONS = ("stop", "signature")
 
-def generate_dynamic_persona(query: dict) -> dict:
+
+class RateLimiter:
     """
-    Generate a dynamic expert persona based on the query's niche/topic.
-    This makes the responder appear as an expert in the specific field.
+    Thread-safe limiter that spaces request starts evenly so that no more
+    than `per_minute` requests begin per minute across all threads.
     """
-    safe_query = truncate_text(query.get("query", ""), max_chars=1500)
-    safe_title = query.get("title", "")[:200]
-    
-    persona_prompt = f"""
-Based on this HARO query, create a professional expert persona that would be credible for responding:
 
-Title: {safe_title}
-Query: {safe_query[:800]}
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
 
-Generate a JSON object with:
-- "name": A professional first name (use "{BASE_PERSONA['name']}" as the name)
-- "title": A specific expert title relevant to the query topic (e.g., "Energy Efficiency Specialist", "Personal Finance Advisor", "Digital Transformation Consultant")
-- "company": A credible company name (use "{BASE_PERSONA['company']}" format, or create a relevant one)
-- "website": Use exactly "{BASE_PERSONA['website']}" as the website URL
-- "expertise": One sentence describing their specific expertise in the query's domain
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
-Make the title and expertise highly relevant to the query topic. Be specific and credible.
-Respond ONLY with valid JSON, no other text.
-"""
+    def back_off(self, seconds: float):
+        """
+        Push every waiting caller back after the API reported a rate limit.
+        """
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+# Groq limits each model separately, so each gets its own limiter
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
 
+
+def rate_limiter_for(model: str) -> RateLimiter:
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(model)
+        if limiter is None:
+            limiter = _rate_limiters[model] = RateLimiter(GROQ_REQUESTS_PER_MINUTE)
+        return limiter
+
+
+def _retry_after_seconds(error, attempt: int) -> float:
+    """
+    Exponential backoff with full jitter, but never shorter than the
+    server's retry-after.
+    """
+    delay = random.uniform(0, min(RATE_LIMIT_MAX_DELAY, RATE_LIMIT_BASE_DELAY * 2 ** attempt))
+    retry_after = error.response.headers.get("retry-after") if error.response else None
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a persona generator. Respond only with valid JSON."},
-                {"role": "user", "content": persona_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=300
-        )
-        persona_json = response.choices[0].message.content.strip()
-        
-        # Remove markdown code blocks if present
-        if persona_json.startswith("```"):
-            persona_json = persona_json.split("```")[1]
-            if persona_json.startswith("json"):
-                persona_json = persona_json[4:]
-        persona_json = persona_json.strip()
-        
-        dynamic_persona = json.loads(persona_json)
-        
-        # Ensure base fields exist - always use base website
-        dynamic_persona["name"] = dynamic_persona.get("name", BASE_PERSONA["name"])
-        dynamic_persona["company"] = dynamic_persona.get("company", BASE_PERSONA["company"])
-        dynamic_persona["website"] = BASE_PERSONA["website"]  # Always use base website
-        
-        return dynamic_persona
-        
-    except Exception as e:
-        print(f"⚠️ Failed to generate dynamic persona, using base persona: {e}")
-        return BASE_PERSONA
-
-
-def generate_pitch(query: dict) -> str:
-    safe_query = truncate_text(query.get("query", ""), max_chars=3500)
-    
-    # Generate dynamic persona based on query niche
-    persona = generate_dynamic_persona(query)
-    
-    expertise_note = ""
-    if "expertise" in persona:
-        expertise_note = f" Your expertise: {persona['expertise']}"
-    
-    system_msg = (
-        f"You are {persona['name']}, {persona['title']} at "
-        f"{persona['website']}.{expertise_note} "
-        f"Write like a real human expert - direct, conversational, and helpful. No marketing fluff or buzzwords."
+        return max(float(retry_after), delay)
+    except (TypeError, ValueError):
+        return delay
+
+
+def _read_stream(stream, model: str, stop_when=None, reject_when=None):
+    """
+    Collect a streamed completion into a response shaped like a regular one.
+    The stream is closed early once `stop_when(text)` is true (finish_reason
+    "signature") or `reject_when(text)` finds something (finish_reason
+    "rejected"), so no more tokens are generated than needed.
+    """
+    parts = []
+    finish_reason = None
+    usage = None
+    try:
+        for chunk in stream:
+            x_groq = getattr(chunk, "x_groq", None)
+            usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if not choice.delta.content:
+                continue
+            parts.append(choice.delta.content)
+            text = "".join(parts)
+            if reject_when and reject_when(text):
+                finish_reason = "rejected"
+                break
+            if stop_when and "\n" in choice.delta.content and stop_when(text):
+                incr("groq.stream_early_stops")
+                finish_reason = "signature"
+                break
+    finally:
+        stream.close()
+    return _response(model, "".join(parts), finish_reason, usage)
+
+
+def _response(model: str, content: str, finish_reason: str | None, usage=None, cached=False):
+    """
+    A stand-in for a Groq ChatCompletion with one choice.
+    """
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(
+            message=SimpleNamespace(role="assistant", content=content),
+            finish_reason=finish_reason,
+        )],
+        usage=usage,
+        cached=cached,
     )
 
-    user_prompt = f"""
-Publication: {query.get('publication', '')}
-Title: {query.get('title', '')}
 
-Query:
-{safe_query}
+def _chat_completion(**kwargs):
+    """
+    client.chat.completions.create behind the model's shared rate limiter. On
+    a 429 all workers back off exponentially (at least the server's
+    retry-after) before retrying.
+
+    With stream=True the reply is read as it arrives and returned as a
+    regular response; `stop_when` and `reject_when` are passed on to
+    _read_stream.
+
+    Completions are answered from the on-disk completion cache when the
+    same request was made before, without touching the API. Only complete
+    replies (see CACHEABLE_FINISH_REASONS) are cached.
+    """
+    stop_when = kwargs.pop("stop_when", None)
+    reject_when = kwargs.pop("reject_when", None)
+
+    cache = get_completion_cache()
+    cache_key = completion_key(kwargs) if cache else None
+    cached = cache.get(cache_key) if cache else None
+    if cached is not None:
+        incr("llm_cache.hits")
+        return _response(cached["model"], cached["content"], cached["finish_reason"], cached=True)
+
+    from groq import RateLimitError
+
+    groq_client = get_groq_client()
+    rate_limiter = rate_limiter_for(kwargs.get("model"))
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        rate_limiter.acquire()
+        try:
+            with span("groq.completion", model=kwargs.get("model")):
+                response = groq_client.chat.completions.create(**kwargs)
+                if kwargs.get("stream"):
+                    response = _read_stream(response, kwargs.get("model"), stop_when, reject_when)
+            metrics.record_usage(kwargs.get("model"), getattr(response, "usage", None))
+            if cache:
+                incr("llm_cache.misses")
+                choice = response.choices[0]
+                # Rejected or cut-off drafts must be generated afresh next time
+                if choice.finish_reason in CACHEABLE_FINISH_REASONS:
+                    cache.put(cache_key, kwargs.get("model"), choice.message.content or "",
+                              choice.finish_reason)
+            return response
+        except RateLimitError as e:
+            incr("groq.rate_limited")
+            if attempt == RATE_LIMIT_RETRIES:
+                raise
+            wait = _retry_after_seconds(e, attempt)
+            print(f"⏳ Groq rate limit hit on {kwargs.get('model')}, retrying in {wait:.1f}s")
+            rate_limiter.back_off(wait)
+
+
+def __getattr__(name):
+    # BASE_PERSONA, the default profile's base persona, is read from disk
+    # only when something asks for it
+    if name == "BASE_PERSONA":
+        return get_profile().persona
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+PRIMARY_MODEL = "llama-3.3-70b-versatile"
+FALLBACK_MODEL = "llama-3.1-8b-instant"
+
+# "true": one LLM call returns persona and pitch together when no persona is
+# cached for the query's niche. "false": separate persona and pitch calls.
+SINGLE_CALL_MODE = os.getenv("PITCH_SINGLE_CALL", "true").lower() == "true"
+
+# "true": pitches are streamed and checked as they arrive, stopping at the
+# signature and aborting drafts that cite statistics
+STREAM_PITCHES = os.getenv("PITCH_STREAMING", "true").lower() == "true"
+PITCH_MAX_TOKENS = 600
+CONTINUATION_MAX_TOKENS = 200
+
+# The persona only needs the gist of a query, not all of it
+PERSONA_EXCERPT_TOKENS = int(os.getenv("PERSONA_EXCERPT_TOKENS", "150"))
 
-Write a direct, human-sounding response that answers the query:
-- Be direct and to the point - answer the question asked, no fluff
+PITCH_GUIDELINES = """- Be direct and to the point - answer the question asked, no fluff
 - Use natural, conversational language like you're talking to a colleague
 - Keep it short (1-2 short paragraphs maximum)
 - Include one clear, quotable sentence that directly addresses their question
@@ -114,38 +245,292 @@ Write a direct, human-sounding response that answers the query:
 - Do NOT make up fake data, statistics, or case studies
 - Do NOT add unnecessary background or sales pitches
 - Just answer what they're asking for in a helpful, expert way
-- IMPORTANT: Write complete, full sentences - do not cut off mid-sentence
+- IMPORTANT: Write complete, full sentences - do not cut off mid-sentence"""
+
+EXPERT_VOICE = (
+    "Write like a real human expert - direct, conversational, and helpful. "
+    "No marketing fluff or buzzwords."
+)
+
+# Static prompt parts. The query is always appended last, so requests share
+# these prefixes verbatim.
+PERSONA_SYSTEM_PROMPT = "You are a persona generator. Respond only with valid JSON."
+COMBINED_SYSTEM_PROMPT = (
+    f"You are a real human expert answering journalist queries. {EXPERT_VOICE} "
+    "Respond only with valid JSON."
+)
+PITCH_INSTRUCTIONS = f"""Write a direct, human-sounding response that answers the HARO query below:
+{PITCH_GUIDELINES}"""
+NO_STATISTICS_NOTE = (
+    "Your previous draft cited statistics, percentages or studies. Do not use any "
+    "numbers, percentages, surveys or studies at all - answer from experience only."
+)
+CONTINUE_PROMPT = (
+    "Your reply was cut off. Continue exactly where it stopped, without repeating "
+    "anything: finish the last sentence, then end with the signature."
+)
+
+
+# Routes every completion: 70B first, 8B on failure, open circuit or (when
+# hedging is enabled) a slow 70B call. Its state is saved after each run.
+router = ModelRouter(PRIMARY_MODEL, FALLBACK_MODEL, _chat_completion,
+                     state_path=ROUTER_STATE_FILE)
+
+
+def save_router_state():
+    """
+    Persist the router's circuit state and latency samples for the next run.
+    """
+    router.save_state()
+
+
+def _complete_with_fallback(build_messages, max_tokens: int, **kwargs):
+    """
+    Complete on the 70B model, falling back to 8B through the router.
+    `build_messages(model)` returns the messages fitted to that model's
+    prompt budget.
+    """
+    return router.complete(build_messages, temperature=0.7, max_tokens=max_tokens, **kwargs)
+
+
+def _parse_json_reply(text: str) -> dict:
+    text = text.strip()
+    # Remove markdown code blocks if present
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return json.loads(text.strip())
+
+
+def _base_persona(query: dict) -> dict:
+    """
+    Base persona of the profile the query was routed to.
+    """
+    return get_profile(query.get("profile")).persona
+
 
-End with this complete signature:
+def _apply_base_persona(persona: dict, base: dict) -> dict:
+    # Ensure base fields exist - always use base website
+    persona["name"] = persona.get("name") or base["name"]
+    persona["title"] = persona.get("title") or base["title"]
+    persona["company"] = persona.get("company") or base["company"]
+    persona["website"] = base["website"]  # Always use base website
+    return persona
 
-{persona['name']}
-{persona['title']}
-{persona['website']}
-"""
+
+@lru_cache(maxsize=32)
+def _persona_fields_prompt(name: str, company: str, website: str) -> str:
+    return f"""- "name": A professional first name (use "{name}" as the name)
+- "title": A specific expert title relevant to the query topic (e.g., "Energy Efficiency Specialist", "Personal Finance Advisor", "Digital Transformation Consultant")
+- "company": A credible company name (use "{company}" format, or create a relevant one)
+- "website": Use exactly "{website}" as the website URL
+- "expertise": One sentence describing their specific expertise in the query's domain"""
+
+
+@lru_cache(maxsize=32)
+def _persona_instructions(name: str, company: str, website: str) -> str:
+    return f"""Based on the HARO query below, create a professional expert persona that would be credible for responding.
+
+Generate a JSON object with:
+{_persona_fields_prompt(name, company, website)}
+
+Make the title and expertise highly relevant to the query topic. Be specific and credible.
+Respond ONLY with valid JSON, no other text."""
+
+
+@lru_cache(maxsize=32)
+def _combined_instructions(name: str, company: str, website: str) -> str:
+    return f"""First choose a professional expert persona that would be credible for responding to the HARO query below:
+{_persona_fields_prompt(name, company, website)}
+
+Then, as that persona, write a direct, human-sounding response that answers the query:
+{PITCH_GUIDELINES}
+- End the response with a signature of three lines: name, title and website
+
+Respond ONLY with a JSON object with the keys "name", "title", "company",
+"website", "expertise" and "pitch", no other text."""
+
+
+def generate_dynamic_persona(query: dict) -> dict:
+    """
+    Generate a dynamic expert persona based on the query's niche/topic.
+    This makes the responder appear as an expert in the specific field.
+    """
+    excerpt = {
+        "publication": query.get("publication", ""),
+        "title": query.get("title", ""),
+        "query": fit_to_tokens(query.get("query", ""), PERSONA_EXCERPT_TOKENS),
+    }
+
+    base = _base_persona(query)
+    instructions = _persona_instructions(base["name"], base["company"], base["website"])
+
+    def messages_for(model: str) -> list[dict]:
+        return build_messages(PERSONA_SYSTEM_PROMPT, instructions, excerpt, model)
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=600
-        )
+        response = _complete_with_fallback(messages_for, max_tokens=300)
+        return _apply_base_persona(_parse_json_reply(response.choices[0].message.content), base)
+        
     except Exception as e:
-        print("⚠️ 70B model failed, switching to 8B:", e)
-
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=600
+        print(f"⚠️ Failed to generate dynamic persona, using base persona: {e}")
+        return base
+
+
+def _signature(persona: dict) -> str:
+    return f"{persona['name']}\n{persona['title']}\n{persona['website']}"
+
+
+def _ensure_signature(pitch: str, persona: dict) -> str:
+    pitch = pitch.strip()
+    if pitch.endswith(persona["website"]):
+        return pitch
+    return f"{pitch}\n\n{_signature(persona)}"
+
+
+@lru_cache(maxsize=64)
+def _pitch_system_prompt(name: str, title: str, website: str, expertise: str) -> str:
+    expertise_note = f" Your expertise: {expertise}" if expertise else ""
+    return (
+        f"You are {name}, {title} at {website}.{expertise_note} {EXPERT_VOICE}\n\n"
+        f"End every response with this complete signature:\n\n{name}\n{title}\n{website}"
+    )
+
+
+def generate_persona_and_pitch(query: dict) -> tuple[dict, str | None]:
+    """
+    Single LLM round trip that returns the expert persona and the pitch
+    together as one JSON object. Falls back to separate persona and pitch
+    calls if the structured reply cannot be parsed.
+    """
+    base = _base_persona(query)
+    instructions = _combined_instructions(base["name"], base["company"], base["website"])
+
+    def messages_for(model: str) -> list[dict]:
+        return build_messages(COMBINED_SYSTEM_PROMPT, instructions, query, model)
+
+    try:
+        response = _complete_with_fallback(
+            messages_for, max_tokens=900, response_format={"type": "json_object"}
         )
+        reply = _parse_json_reply(response.choices[0].message.content)
+        pitch = reply.pop("pitch", "")
+        if not pitch.strip():
+            raise ValueError("reply has no pitch")
+        persona = _apply_base_persona(reply, base)
+    except Exception as e:
+        print(f"⚠️ Single-call generation failed, using separate persona and pitch calls: {e}")
+        persona = generate_dynamic_persona(query)
+        return persona, write_pitch(query, persona)
+
+    pitch = trim_after_signature(pitch.strip(), persona["website"])
+    if invented_statistics(pitch) or is_truncated(pitch, persona):
+        # Keep the persona, rewrite just the pitch with the checked writer
+        print("⚠️ Single-call pitch failed quality checks, rewriting it")
+        incr("pitches.rewritten")
+        return persona, write_pitch(query, persona)
+    return persona, _ensure_signature(pitch, persona)
+
+
+def _with_note(build_messages, note: str):
+    """
+    Wrap `build_messages` so the user message ends with `note`.
+    """
+    def messages_for(model: str) -> list[dict]:
+        messages = build_messages(model)
+        messages[-1] = {**messages[-1], "content": f"{messages[-1]['content']}\n\n{note}"}
+        return messages
+    return messages_for
+
+
+def _draft_pitch(build_messages, persona: dict) -> str:
+    """
+    One pitch draft. A draft that was cut off is completed with a short
+    continuation request instead of being regenerated.
+    """
+    website = persona["website"]
+    stream_kwargs = {}
+    if STREAM_PITCHES:
+        stream_kwargs = {
+            "stream": True,
+            "stop_when": lambda text: signature_complete(text, website),
+            "reject_when": invented_statistics,
+        }
+    response = _complete_with_fallback(build_messages, max_tokens=PITCH_MAX_TOKENS, **stream_kwargs)
+    choice = response.choices[0]
+    draft = trim_after_signature(choice.message.content.strip(), website)
+    if choice.finish_reason == "rejected":
+        return draft
+
+    if choice.finish_reason == "length" or is_truncated(draft, persona):
+        incr("pitches.continued")
+
+        def continuation_messages(model: str) -> list[dict]:
+            return build_messages(model) + [
+                {"role": "assistant", "content": draft},
+                {"role": "user", "content": CONTINUE_PROMPT},
+            ]
+
+        response = _complete_with_fallback(continuation_messages,
+                                           max_tokens=CONTINUATION_MAX_TOKENS, **stream_kwargs)
+        tail = response.choices[0].message.content.rstrip()
+        # The draft was stripped, so the word boundary has to be put back
+        joiner = "" if tail[:1].isspace() else " "
+        draft = trim_after_signature(draft + joiner + tail, website)
+    return draft
+
+
+def write_pitch(query: dict, persona: dict) -> str | None:
+    """
+    Write the pitch for `query` in the voice of an already chosen `persona`.
+    A draft citing statistics is regenerated once with an explicit warning;
+    if that one cites them too, the query is skipped and None is returned.
+    """
+    system_msg = _pitch_system_prompt(persona["name"], persona["title"],
+                                      persona["website"], persona.get("expertise", ""))
+
+    def messages_for(model: str) -> list[dict]:
+        return build_messages(system_msg, PITCH_INSTRUCTIONS, query, model)
+
+    for attempt in range(2):
+        build = messages_for if attempt == 0 else _with_note(messages_for, NO_STATISTICS_NOTE)
+        pitch = _draft_pitch(build, persona)
+        statistics = invented_statistics(pitch)
+        if not statistics:
+            return _ensure_signature(pitch, persona)
+        incr("pitches.rejected_statistics")
+        print(f"⚠️ Pitch draft cites statistics ({', '.join(statistics)}), rejecting it")
+    print(f"⏩ Skipping query, every pitch draft cited statistics: {query.get('title', '')[:50]}...")
+    incr("pitches.skipped_statistics")
+    return None
+
+
+def generate_pitch(query: dict) -> str | None:
+    """
+    Generate the pitch for a query. Queries in a niche that already has a
+    cached persona (for the query's profile) reuse it and skip persona
+    generation; otherwise the persona is generated (together with the pitch
+    in single-call mode) and cached for the niche. None if the query was
+    skipped (see write_pitch).
+    """
+    niche = query.get("niche")
+    profile = query.get("profile") or DEFAULT_PROFILE
+    # Default-profile entries keep their plain niche keys
+    cache_key = niche if not niche or profile == DEFAULT_PROFILE else f"{profile}:{niche}"
+    persona = persona_cache.get(cache_key) if cache_key else None
+    if persona is not None:
+        incr("persona_cache.hits")
+        return write_pitch(query, persona)
+    incr("persona_cache.misses")
+
+    if SINGLE_CALL_MODE:
+        persona, pitch = generate_persona_and_pitch(query)
+    else:
+        # Generate dynamic persona based on query niche
+        persona = generate_dynamic_persona(query)
+        pitch = write_pitch(query, persona)
 
-    # Groq client returns .choices[0].message.content
-    content = response.choices[0].message.content
-    return content.strip()
+    if cache_key and persona is not _base_persona(query):
+        persona_cache.put(cache_key, persona)
+    return pitch
@@ -0,0 +1,252 @@
+"""
+Pitching profiles: one per brand, each with its own niche keywords,
+exclusions, base persona and sender address.
+
+Profiles are read from HARO_PROFILES_FILE, a JSON list such as
+
+    [
+      {
+        "name": "printebill",
+        "persona": "persona.json",
+        "sender": "zahid@printebill.com",
+        "keywords": {"Energy": ["electricity", "solar", "energy saving"]},
+        "keyword_weights": {"power": 0.3},
+        "excluded_keywords": ["casino", "betting"],
+        "excluded_weights": {"odds": 0.5},
+        "relevance_threshold": 1.0
+      }
+    ]
+
+"persona" is a persona file or an inline persona object; "keywords" is a
+list or a dict of niche category -> keywords. Fields left out fall back to
+the single-brand settings (haro_parser keywords, persona.json, GMAIL_USER).
+Without a profiles file there is one profile, "default", built from those
+settings. A "sender" other than GMAIL_USER must be a Gmail send-as alias.
+"""
+import json
+import os
+
+from haro_parser import (DEFAULT_PHRASE_WEIGHT, DEFAULT_WORD_WEIGHT, EXCLUDED_KEYWORDS,
+                         EXCLUDED_WEIGHTS, EXCLUSION_THRESHOLD, KEYWORD_WEIGHTS,
+                         NICHE_CATEGORIES, RELEVANCE_THRESHOLD, apply_relevance_model,
+                         extract_queries, query_fingerprint)
+from keyword_matcher import KeywordMatcher, normalize_keywords
+from metrics import incr, span
+
+PROFILES_FILE = os.getenv("HARO_PROFILES_FILE", "profiles.json")
+PERSONA_FILE = "persona.json"
+DEFAULT_PROFILE = "default"
+
+
+def load_persona(path=PERSONA_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _normalized_weights(weights: dict) -> dict:
+    return {" ".join(kw.lower().split()): w for kw, w in weights.items()}
+
+
+class Profile:
+    def __init__(self, name: str, persona=PERSONA_FILE, sender: str | None = None,
+                 keywords=None, keyword_weights: dict | None = None,
+                 excluded_keywords=None, excluded_weights: dict | None = None,
+                 relevance_threshold: float | None = None):
+        self.name = name
+        self.sender = sender or os.getenv("GMAIL_USER")
+        self._persona_source = persona
+        self._persona = None
+
+        keywords = NICHE_CATEGORIES if keywords is None else keywords
+        if not isinstance(keywords, dict):
+            # A flat list is one niche named after the profile
+            keywords = {name: keywords}
+        # Normalized keyword -> niche categories it is listed under
+        self.categories = {}
+        for category, words in keywords.items():
+            for kw in normalize_keywords(words):
+                self.categories.setdefault(kw, []).append(category)
+
+        self.keyword_weights = _normalized_weights(
+            KEYWORD_WEIGHTS if keyword_weights is None else keyword_weights)
+        self.excluded_keywords = normalize_keywords(
+            EXCLUDED_KEYWORDS if excluded_keywords is None else excluded_keywords)
+        self.excluded_weights = _normalized_weights(
+            EXCLUDED_WEIGHTS if excluded_weights is None else excluded_weights)
+        self.relevance_threshold = (RELEVANCE_THRESHOLD if relevance_threshold is None
+                                    else float(relevance_threshold))
+
+    @property
+    def persona(self) -> dict:
+        """
+        The base persona, read from its file on first use.
+        """
+        if self._persona is None:
+            source = self._persona_source
+            self._persona = load_persona(source) if isinstance(source, str) else dict(source)
+        return self._persona
+
+    def keyword_weight(self, keyword: str) -> float:
+        if keyword in self.keyword_weights:
+            return self.keyword_weights[keyword]
+        return DEFAULT_PHRASE_WEIGHT if " " in keyword else DEFAULT_WORD_WEIGHT
+
+
+class ProfileIndex:
+    """
+    Inverted index from keyword to the profiles that list it.
+
+    All profiles' keywords and exclusions go into one KeywordMatcher, so a
+    query is scanned once however many profiles there are; its hits are
+    then looked up in the postings, touching only the profiles that share
+    a keyword with the query.
+    """
+
+    def __init__(self, profiles: list[Profile]):
+        self.profiles = profiles
+        # keyword -> [(profile index, weight, categories)]
+        self._postings = {}
+        # excluded keyword -> [(profile index, weight)]
+        self._exclusions = {}
+        for i, profile in enumerate(profiles):
+            for kw, categories in profile.categories.items():
+                self._postings.setdefault(kw, []).append((i, profile.keyword_weight(kw), categories))
+            for kw in profile.excluded_keywords:
+                self._exclusions.setdefault(kw, []).append((i, profile.excluded_weights.get(kw, 1.0)))
+        self.matcher = KeywordMatcher(list(self._postings) + list(self._exclusions), whole_words=True)
+
+    def route(self, text: str) -> list[tuple[Profile, float, list[str], str | None]]:
+        """
+        (profile, score, matched keywords, niche) for every profile `text` is
+        relevant to. A profile scores the summed weight of the distinct
+        keywords it lists; texts whose exclusion weight reaches
+        EXCLUSION_THRESHOLD, or that score below the profile's threshold, are
+        not relevant to it. The niche is the category the hits weigh most in.
+        """
+        if not text:
+            return []
+        hits = sorted(self.matcher.find_all(text))
+        excluded = {}
+        matched = {}
+        for kw in hits:
+            for i, weight in self._exclusions.get(kw, ()):
+                excluded[i] = excluded.get(i, 0.0) + weight
+            for i, weight, categories in self._postings.get(kw, ()):
+                matched.setdefault(i, []).append((kw, weight, categories))
+
+        routes = []
+        for i, keywords in matched.items():
+            profile = self.profiles[i]
+            if excluded.get(i, 0.0) >= EXCLUSION_THRESHOLD:
+                continue
+            score = round(sum(weight for _, weight, _ in keywords), 2)
+            if score < profile.relevance_threshold:
+                continue
+            niches = {}
+            for _, weight, categories in keywords:
+                for category in categories:
+                    niches[category] = niches.get(category, 0.0) + weight
+            niche = max(niches, key=niches.get) if niches else None
+            routes.append((profile, score, [kw for kw, _, _ in keywords], niche))
+        return routes
+
+
+def _profile_from_config(config: dict) -> Profile:
+    return Profile(
+        name=config["name"],
+        persona=config.get("persona", PERSONA_FILE),
+        sender=config.get("sender"),
+        keywords=config.get("keywords"),
+        keyword_weights=config.get("keyword_weights"),
+        excluded_keywords=config.get("excluded_keywords"),
+        excluded_weights=config.get("excluded_weights"),
+        relevance_threshold=config.get("relevance_threshold"),
+    )
+
+
+def load_profiles(path: str = PROFILES_FILE) -> list[Profile]:
+    """
+    Profiles from `path`, or just the default profile if there is no file.
+    """
+    if not path or not os.path.exists(path):
+        return [Profile(DEFAULT_PROFILE)]
+    with open(path, "r", encoding="utf-8") as f:
+        profiles = [_profile_from_config(config) for config in json.load(f)]
+    print(f"👥 Loaded {len(profiles)} profiles: {', '.join(p.name for p in profiles)}")
+    return profiles
+
+
+_index = None
+
+
+def get_profile_index() -> ProfileIndex:
+    """
+    Return the process-wide profile index, building it on first use.
+    """
+    global _index
+    if _index is None:
+        _index = ProfileIndex(load_profiles())
+    return _index
+
+
+def get_profile(name: str | None = None) -> Profile:
+    """
+    The profile called `name`, or the first profile for None/unknown names.
+    """
+    profiles = get_profile_index().profiles
+    for profile in profiles:
+        if profile.name == name:
+            return profile
+    return profiles[0]
+
+
+def dedup_key(query: dict) -> str:
+    """
+    haro_parser.query_fingerprint scoped to the query's profile, so each
+    brand may pitch the same query once. The default profile keeps plain
+    fingerprints, so existing dedup entries stay valid.
+    """
+    fingerprint = query_fingerprint(query)
+    profile = query.get("profile")
+    if profile and profile != DEFAULT_PROFILE:
+        return f"{profile}|{fingerprint}"
+    return fingerprint
+
+
+def route_queries(queries: list[dict]) -> list[dict]:
+    """
+    Route each query to every profile it is relevant to. Returns one copy
+    of the query per matching profile, with "profile", "relevance_score",
+    "matched_keywords" and "niche" set for that profile, best first.
+    Queries matching no profile are dropped; the learned relevance model,
+    if trained, vets the rest.
+    """
+    index = get_profile_index()
+    routes = {}
+    for q in queries:
+        matches = index.route(f"{q.get('title', '')}\n{q.get('query', '')}")
+        if matches:
+            routes[id(q)] = matches
+    incr("queries.filtered", len(queries) - len(routes))
+    relevant = apply_relevance_model([q for q in queries if id(q) in routes])
+
+    routed = []
+    for q in relevant:
+        for profile, score, hits, niche in routes[id(q)]:
+            routed.append({**q, "profile": profile.name, "relevance_score": score,
+                           "matched_keywords": hits, "niche": niche})
+    routed.sort(key=lambda q: q["relevance_score"], reverse=True)
+    return routed
+
+
+def route_haro_email(email_body: str, received_at=None) -> list[dict]:
+    """
+    Parse a HARO digest once and route each query to every matching
+    profile (see route_queries).
+    """
+    with span("parse"):
+        all_queries = extract_queries(email_body, received_at)
+        routed = route_queries(all_queries)
+    incr("queries.parsed", len(all_queries))
+    incr("queries.routed", len(routed))
+    return routed
@@ -0,0 +1,144 @@
+import os
+import re
+from functools import lru_cache
+
+# Encoding used to count prompt tokens when tiktoken is installed. Llama 3
+# uses a tiktoken-style BPE, so cl100k_base is a close local approximation.
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "cl100k_base")
+
+# Where tiktoken keeps the encoding's BPE file after the first download.
+# tiktoken defaults to the temp directory, which a fresh CI runner does not
+# keep; this directory is part of the run state the workflow saves.
+TIKTOKEN_CACHE_DIR = os.getenv("TIKTOKEN_CACHE_DIR", ".tiktoken_cache")
+
+# Most tokens a whole prompt (system + user message) may use, per model.
+# The 8B fallback gets a tighter budget so long queries cannot crowd it.
+MODEL_PROMPT_BUDGETS = {
+    "llama-3.3-70b-versatile": int(os.getenv("PROMPT_BUDGET_70B", "1400")),
+    "llama-3.1-8b-instant": int(os.getenv("PROMPT_BUDGET_8B", "900")),
+}
+DEFAULT_PROMPT_BUDGET = int(os.getenv("PROMPT_BUDGET_DEFAULT", "1200"))
+
+TRUNCATION_MARKER = "[...]"
+
+# Sentence ends, or blank lines between paragraphs
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*\n")
+
+# Word pieces roughly as a BPE tokenizer splits them: runs of letters, runs of
+# up to three digits, and single punctuation marks
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """
+    The tiktoken encoding, or None if tiktoken is not installed or its BPE
+    file cannot be loaded (it is downloaded once, then cached in
+    TIKTOKEN_CACHE_DIR).
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            os.environ.setdefault("TIKTOKEN_CACHE_DIR", os.path.abspath(TIKTOKEN_CACHE_DIR))
+            import tiktoken
+            _encoding = tiktoken.get_encoding(PROMPT_TOKENIZER)
+        except Exception as e:
+            print(f"⚠️ tiktoken unavailable, estimating prompt tokens locally: {e}")
+            _encoding = None
+    return _encoding
+
+
+def _estimate_tokens(text: str) -> int:
+    # Long words are split into several BPE tokens, about one per 4 letters
+    return sum(max(1, len(piece) // 4) if piece.isalpha() else 1
+               for piece in _PIECE_RE.findall(text))
+
+
+@lru_cache(maxsize=256)
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens in `text`. Cached, so static prompt parts are only
+    measured once.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _estimate_tokens(text)
+
+
+def prompt_budget(model: str) -> int:
+    return MODEL_PROMPT_BUDGETS.get(model, DEFAULT_PROMPT_BUDGET)
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_END_RE.split(text) if s and s.strip()]
+
+
+def fit_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shorten `text` to at most `max_tokens` tokens, cutting after the last
+    whole sentence that fits. A first sentence that alone is too long is cut
+    at a word boundary instead.
+    """
+    text = (text or "").strip()
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER) - 1
+    if budget <= 0:
+        return ""
+
+    kept = []
+    used = 0
+    for sentence in split_sentences(text):
+        # +1 for the space joining sentences
+        cost = count_tokens(sentence) + (1 if kept else 0)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+
+    if not kept:
+        words = text.split()
+        lo, hi = 0, len(words)
+        # Longest word prefix within the budget
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(" ".join(words[:mid])) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        kept = [" ".join(words[:lo])] if lo else []
+
+    return " ".join(kept + [TRUNCATION_MARKER])
+
+
+def query_block(query: dict, max_tokens: int) -> str:
+    """
+    The publication, title and query text of a HARO query, with the query
+    text fitted into whatever `max_tokens` leaves after the header.
+    """
+    header = f"Publication: {query.get('publication', '')}\nTitle: {query.get('title', '')}\n\nQuery:\n"
+    return header + fit_to_tokens(query.get("query", ""), max_tokens - count_tokens(header))
+
+
+def build_messages(system: str, instructions: str, query: dict, model: str,
+                   reserve: int = 0) -> list[dict]:
+    """
+    Chat messages for `model`: the static `system` prompt, then a user
+    message made of the static `instructions` followed by the query.
+
+    The query comes last so that every request with the same instructions
+    shares an identical prefix, and it is fitted to the model's prompt
+    budget minus the static parts and `reserve` tokens.
+    """
+    available = prompt_budget(model) - count_tokens(system) - count_tokens(instructions) - reserve
+    user = f"{instructions}\n\n{query_block(query, available)}"
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
@@ -0,0 +1,204 @@
+"""
+Learned relevance filter: predicts whether a HARO query is likely to get a
+response, from the outcomes recorded in the pitch log.
+
+Features are hashed word unigrams and bigrams of the title and query text;
+the model is a logistic regression trained with NumPy. Train it with
+
+    python relevance_model.py            # from the Google Sheets pitch log
+    python relevance_model.py log.csv    # from a CSV export of the log
+
+which writes RELEVANCE_MODEL_PATH. haro_parser uses the model, when the
+file exists, to drop queries that are unlikely to convert. Commit the file
+after training: the scheduled workflow runs from a fresh checkout and only
+finds the model if it is tracked in git.
+"""
+import csv
+import os
+import re
+import sys
+import zlib
+
+import numpy as np
+
+RELEVANCE_MODEL_PATH = os.getenv("RELEVANCE_MODEL_PATH", "relevance_model.npz")
+
+# Overrides the decision threshold stored in the model file
+RELEVANCE_MODEL_THRESHOLD = os.getenv("RELEVANCE_MODEL_THRESHOLD", "")
+
+# Size of the hashed feature space. 2**16 float32 weights compress to a
+# model file of a few hundred KB at most.
+N_FEATURES = 2 ** 16
+
+# The pitch log keeps only this much of each query, so inference looks at
+# the same amount of text that training did
+QUERY_CHARS = 500
+
+# Outcome column values counted as a conversion / a miss; other rows are
+# unlabeled and ignored
+POSITIVE_OUTCOMES = {"responded", "response", "published", "featured", "yes", "1", "true"}
+NEGATIVE_OUTCOMES = {"no response", "ignored", "rejected", "no", "0", "false"}
+
+# Training keeps at least this share of the known conversions when picking
+# the decision threshold
+TARGET_RECALL = 0.9
+
+MIN_TRAINING_ROWS = 20
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(title: str, query: str) -> list[str]:
+    words = _TOKEN_RE.findall(f"{title} {query[:QUERY_CHARS]}".lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def featurize(docs: list[tuple[str, str]], n_features: int = N_FEATURES):
+    """
+    Sparse feature matrix for (title, query) pairs in coordinate form:
+    (row indices, column indices, values). Features are binary and each row
+    is L2-normalized.
+    """
+    rows, cols = [], []
+    for i, (title, query) in enumerate(docs):
+        hashed = {zlib.crc32(t.encode("utf-8")) % n_features for t in _tokens(title, query)}
+        rows.extend([i] * len(hashed))
+        cols.extend(hashed)
+    rows = np.asarray(rows, dtype=np.int32)
+    cols = np.asarray(cols, dtype=np.int32)
+    counts = np.bincount(rows, minlength=len(docs)).astype(np.float32)
+    values = 1.0 / np.sqrt(np.maximum(counts, 1.0))[rows]
+    return rows, cols, values
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class RelevanceModel:
+    def __init__(self, weights, bias: float, threshold: float):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+
+    def predict_proba(self, docs: list[tuple[str, str]]) -> np.ndarray:
+        """
+        Probability of a response for each (title, query) pair, in one
+        vectorized pass over the batch.
+        """
+        if not docs:
+            return np.zeros(0, dtype=np.float32)
+        rows, cols, values = featurize(docs, len(self.weights))
+        logits = np.bincount(rows, weights=self.weights[cols] * values, minlength=len(docs))
+        return _sigmoid(logits + self.bias)
+
+    def save(self, path: str = RELEVANCE_MODEL_PATH):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, weights=self.weights, bias=self.bias,
+                            threshold=self.threshold)
+        os.replace(tmp_path, path)
+
+
+def load_model(path: str = RELEVANCE_MODEL_PATH) -> RelevanceModel | None:
+    """
+    The trained model, or None if there is no model file.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        threshold = float(data["threshold"])
+        if RELEVANCE_MODEL_THRESHOLD:
+            threshold = float(RELEVANCE_MODEL_THRESHOLD)
+        return RelevanceModel(data["weights"], float(data["bias"]), threshold)
+
+
+_model = None
+_model_loaded = False
+
+
+def get_relevance_model() -> RelevanceModel | None:
+    """
+    Return the process-wide model, loading it on first use.
+    """
+    global _model, _model_loaded
+    if not _model_loaded:
+        _model = load_model()
+        _model_loaded = True
+    return _model
+
+
+def train(docs: list[tuple[str, str]], labels, epochs: int = 300, learning_rate: float = 2.0,
+          l2: float = 1e-4, n_features: int = N_FEATURES) -> RelevanceModel:
+    """
+    Fit a logistic regression by full-batch gradient descent. Classes are
+    weighted so that rare conversions count as much as the many misses.
+    """
+    y = np.asarray(labels, dtype=np.float32)
+    n = len(y)
+    rows, cols, values = featurize(docs, n_features)
+    positives = max(y.sum(), 1.0)
+    negatives = max(n - y.sum(), 1.0)
+    sample_weight = np.where(y == 1, n / (2 * positives), n / (2 * negatives)).astype(np.float32)
+
+    w = np.zeros(n_features, dtype=np.float32)
+    b = 0.0
+    for _ in range(epochs):
+        logits = np.bincount(rows, weights=w[cols] * values, minlength=n) + b
+        error = (_sigmoid(logits) - y) * sample_weight / n
+        w -= learning_rate * (np.bincount(cols, weights=error[rows] * values,
+                                          minlength=n_features) + l2 * w).astype(np.float32)
+        b -= learning_rate * float(error.sum())
+
+    model = RelevanceModel(w, b, threshold=0.5)
+    scores = np.sort(model.predict_proba([d for d, label in zip(docs, y) if label == 1]))
+    if len(scores):
+        # Highest threshold that still keeps TARGET_RECALL of the conversions
+        # (1 - 0.9) * 10 is 0.999...; truncating it would keep every conversion
+        model.threshold = float(scores[int(round((1 - TARGET_RECALL) * len(scores)))])
+    return model
+
+
+def labeled_rows(records: list[dict]) -> tuple[list[tuple[str, str]], list[int]]:
+    """
+    (title, query) pairs and 0/1 labels from pitch log records; rows without
+    a recognized Outcome are skipped.
+    """
+    docs, labels = [], []
+    for record in records:
+        outcome = str(record.get("Outcome", "")).strip().lower()
+        if outcome in POSITIVE_OUTCOMES:
+            labels.append(1)
+        elif outcome in NEGATIVE_OUTCOMES:
+            labels.append(0)
+        else:
+            continue
+        docs.append((str(record.get("Title", "")), str(record.get("Query", ""))))
+    return docs, labels
+
+
+def _load_records(argv: list[str]) -> list[dict]:
+    if argv:
+        with open(argv[0], "r", encoding="utf-8", newline="") as f:
+            return list(csv.DictReader(f))
+    from dotenv import load_dotenv
+    load_dotenv()
+    from sheets_client import fetch_pitch_log
+    return fetch_pitch_log()
+
+
+if __name__ == "__main__":
+    docs, labels = labeled_rows(_load_records(sys.argv[1:]))
+    positives = sum(labels)
+    print(f"📚 {len(labels)} labeled pitches ({positives} with a response)")
+    if len(labels) < MIN_TRAINING_ROWS or positives in (0, len(labels)):
+        print(f"❌ Need at least {MIN_TRAINING_ROWS} labeled rows with both outcomes to train.")
+        sys.exit(1)
+
+    model = train(docs, labels)
+    predicted = model.predict_proba(docs) >= model.threshold
+    actual = np.asarray(labels) == 1
+    print(f"📈 Threshold {model.threshold:.3f}: keeps {predicted[actual].mean():.0%} of responded "
+          f"queries and drops {1 - predicted[~actual].mean():.0%} of the others (training data)")
+    model.save()
+    print(f"✅ Model saved to {RELEVANCE_MODEL_PATH}")
+    print(f"   Commit {RELEVANCE_MODEL_PATH} so the scheduled runs pick it up.")
@@ -0,0 +1,49 @@
+import heapq
+import os
+from datetime import datetime, timedelta, timezone
+
+from metrics import incr
+
+# Queries whose deadline is closer than this are skipped: a pitch generated
+# and sent now would arrive too late to be used
+DEADLINE_MARGIN_MINUTES = int(os.getenv("HARO_DEADLINE_MARGIN_MINUTES", "15"))
+
+# Most pitches generated per run (0 = no limit). When the budget runs out,
+# the least urgent queries are deferred to a later run.
+MAX_PITCHES_PER_RUN = int(os.getenv("HARO_MAX_PITCHES_PER_RUN", "0"))
+
+
+def schedule_queries(items: list, query_of=lambda item: item, now: datetime | None = None,
+                     budget: int | None = None) -> tuple[list, list]:
+    """
+    Order pitch work by urgency: earliest deadline first, ties (and queries
+    without a deadline, which go last) broken by higher relevance score.
+    Queries already past their deadline (minus DEADLINE_MARGIN_MINUTES) are
+    dropped. Returns (scheduled, deferred): at most `budget` items to work
+    on now, and the less urgent rest, in the same order, for a later run.
+
+    `items` can be queries or anything wrapping one; `query_of` extracts
+    the query dict (with "deadline_at" and "relevance_score").
+    """
+    now = now or datetime.now(timezone.utc)
+    budget = MAX_PITCHES_PER_RUN if budget is None else budget
+    latest_useful = now + timedelta(minutes=DEADLINE_MARGIN_MINUTES)
+
+    heap = []
+    for seq, item in enumerate(items):
+        q = query_of(item)
+        deadline = q.get("deadline_at")
+        if deadline is not None and deadline < latest_useful:
+            print(f"⏩ Deadline passed ({q.get('deadline')}): {q.get('title', '')[:50]}...")
+            incr("queries.expired")
+            continue
+        deadline_key = deadline.timestamp() if deadline is not None else float("inf")
+        heapq.heappush(heap, (deadline_key, -q.get("relevance_score", 0.0), seq, item))
+
+    limit = budget if budget and budget > 0 else len(heap)
+    ordered = [heapq.heappop(heap)[-1] for _ in range(len(heap))]
+    scheduled, deferred = ordered[:limit], ordered[limit:]
+    if deferred:
+        print(f"⏸️ Run budget of {limit} pitches reached, deferring {len(deferred)} less urgent queries.")
+        incr("queries.over_budget", len(deferred))
+    return scheduled, deferred
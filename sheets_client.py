@@ -2,13 +2,39 @@ import json
 import os
 from datetime import datetime
 
-import gspread
-from google.oauth2.service_account import Credentials
+from metrics import span
 
 SPREADSHEET_ID = "10lYfPW_1ZjmOGkxfTsTw9iHulLXjDtgr_1DpklxTzN8"
 
+# "Outcome" is filled in by hand (e.g. "Responded", "No response") and is
+# what relevance_model learns from; "Profile" is the brand that pitched
+EXPECTED_HEADERS = ["Timestamp", "Title", "Publication", "Query", "Pitch", "Status", "Outcome",
+                    "Profile"]
+
+# Long-lived worksheet handle, created on first use
+_worksheet = None
+
+# Client installed with set_sheets_client, e.g. an offline stand-in
+_client_override = None
+
+
+def set_sheets_client(client):
+    """
+    Use `client` (anything with gspread's open_by_key interface) instead of
+    authorizing with SHEETS_CREDENTIALS. Pass None to go back to the real client.
+    """
+    global _client_override, _worksheet
+    _client_override = client
+    _worksheet = None
+
 
 def get_sheets_client():
+    if _client_override is not None:
+        return _client_override
+    # gspread and google-auth are imported only once a run writes to Sheets
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     creds_json = os.getenv("SHEETS_CREDENTIALS")
     info = json.loads(creds_json)
 
@@ -20,87 +46,100 @@ def get_sheets_client():
     return client
 
 
-def log_pitch(query: dict, pitch: str, status: str = "Sent"):
+def _ensure_headers(sheet):
+    """
+    Add headers if the sheet is empty. Only the first row is read.
     """
-    Log pitch to Google Sheets. If logging fails, prints warning but doesn't crash.
+    first_row = sheet.row_values(1)
+    if not first_row:
+        # Sheet is completely empty, add headers
+        sheet.update('A1:H1', [EXPECTED_HEADERS], value_input_option="RAW")
+        print("📝 Added headers to A1:H1")
+    elif first_row[0].strip() == "Timestamp":
+        print(f"✅ Headers verified (first row starts with 'Timestamp')")
+        if "Outcome" not in first_row:
+            sheet.update('G1', [["Outcome"]], value_input_option="RAW")
+            print("📝 Added Outcome header to G1")
+        if "Profile" not in first_row:
+            sheet.update('H1', [["Profile"]], value_input_option="RAW")
+            print("📝 Added Profile header to H1")
+    else:
+        print(f"⚠️ First row doesn't appear to be headers: {first_row[:3]}")
+
+
+def get_worksheet():
+    """
+    Return the pitch log worksheet. Credentials are parsed, gspread is
+    authorized and headers are checked once per process; later calls reuse
+    the same handle.
+    """
+    global _worksheet
+    if _worksheet is None:
+        print(f"📋 Connecting to Google Sheets (ID: {SPREADSHEET_ID})...")
+        with span("sheets.connect"):
+            client = get_sheets_client()
+            sheet = client.open_by_key(SPREADSHEET_ID).sheet1
+            print(f"✅ Connected to sheet: {sheet.title}")
+            _ensure_headers(sheet)
+        _worksheet = sheet
+    return _worksheet
+
+
+def build_row(query: dict, pitch: str, status: str = "Sent") -> list:
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    return [
+        now,
+        query.get("title", ""),
+        query.get("publication", ""),
+        query.get("query", "")[:500],
+        pitch[:500],
+        status,
+        "",  # Outcome, filled in later
+        query.get("profile", ""),
+    ]
+
+
+def fetch_pitch_log() -> list[dict]:
+    """
+    All logged pitches as dicts keyed by header, for training relevance_model.
+    """
+    with span("sheets.read"):
+        return get_worksheet().get_all_records()
+
+
+def append_rows(rows: list[list]) -> bool:
+    """
+    Append rows below the existing log in a single API call.
+    If logging fails, prints warning but doesn't crash. Returns True on success.
     Google Sheets automatically expands rows (limit ~10 million rows for new sheets).
     """
-    print(f"🔵 log_pitch called - Title: {query.get('title', 'N/A')[:50]}...")
-    print(f"   Query keys: {list(query.keys())}")
-    print(f"   Pitch length: {len(pitch)}")
-    print(f"   Status: {status}")
+    if not rows:
+        return True
+    from gspread.exceptions import APIError
+
     try:
         # Check if credentials are available
-        creds_json = os.getenv("SHEETS_CREDENTIALS")
-        if not creds_json:
+        if _client_override is None and not os.getenv("SHEETS_CREDENTIALS"):
             print("⚠️ SHEETS_CREDENTIALS environment variable not set. Skipping Google Sheets logging.")
             print("   Pitch was still sent successfully. Continuing...")
-            return
-        
-        print(f"📋 Connecting to Google Sheets (ID: {SPREADSHEET_ID})...")
-        client = get_sheets_client()
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
-        sheet = spreadsheet.sheet1
-        print(f"✅ Connected to sheet: {sheet.title}")
-
-        # Get all values once to minimize API calls
-        all_values = sheet.get_all_values()
-        print(f"📊 Retrieved {len(all_values)} rows from sheet")
-
-        # Ensure headers exist - only add if sheet is completely empty
-        expected_headers = ["Timestamp", "Title", "Publication", "Query", "Pitch", "Status"]
-        
-        if not all_values or len(all_values) == 0:
-            # Sheet is completely empty, add headers
-            sheet.update('A1:F1', [expected_headers], value_input_option="RAW")
-            print("📝 Added headers to A1:F1")
-            # Refresh data after adding headers
-            all_values = [expected_headers]
-        else:
-            # Sheet has data, verify headers
-            first_row = all_values[0] if all_values else []
-            if first_row and len(first_row) > 0 and first_row[0].strip() == "Timestamp":
-                print(f"✅ Headers verified (first row starts with 'Timestamp')")
-            else:
-                print(f"⚠️ First row doesn't appear to be headers: {first_row[:3] if first_row else 'empty'}")
-
-        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-
-        row = [
-            now,
-            query.get("title", ""),
-            query.get("publication", ""),
-            query.get("query", "")[:500],
-            pitch[:500],
-            status
-        ]
-
-        print(f"📊 Attempting to log pitch to Google Sheets...")
-        print(f"   Row data: {len(row)} columns, Title: {row[1][:50]}...")
-        print(f"   Full row: {[str(x)[:100] for x in row]}")
-        
-        # Find the next available row (after headers)
-        next_row = len(all_values) + 1
-        range_to_update = f'A{next_row}:F{next_row}'
-        
-        # Append the row
-        try:
-            sheet.update(range_to_update, [row], value_input_option="RAW")
-            print(f"✅ Successfully updated Google Sheets range: {range_to_update}")
-            
-            # Optional verification (only if DEBUG_SHEETS is set)
-            if os.getenv("DEBUG_SHEETS") == "true":
-                try:
-                    # Quick check of the specific row we just updated
-                    check_values = sheet.get(range_to_update)
-                    if check_values and len(check_values) > 0:
-                        print(f"✅ Verified: Row {next_row} has data: {check_values[0][:3]}...")
-                except Exception as verify_error:
-                    print(f"⚠️ Warning: Could not verify row addition: {verify_error}")
-        except Exception as append_error:
-            print(f"❌ Failed to update Google Sheets: {type(append_error).__name__}: {append_error}")
-            raise  # Re-raise to be caught by outer exception handler
-    except gspread.exceptions.APIError as e:
+            return False
+
+        sheet = get_worksheet()
+        print(f"📊 Appending {len(rows)} row(s) to Google Sheets...")
+        with span("sheets.append_rows"):
+            result = sheet.append_rows(rows, value_input_option="RAW", table_range="A1")
+        updated_range = (result or {}).get("updates", {}).get("updatedRange", "")
+        print(f"✅ Successfully updated Google Sheets range: {updated_range}")
+
+        # Optional verification (only if DEBUG_SHEETS is set)
+        if os.getenv("DEBUG_SHEETS") == "true" and updated_range:
+            try:
+                check_values = sheet.get(updated_range.split("!")[-1])
+                print(f"✅ Verified: {len(check_values)} row(s) written, first: {check_values[0][:3]}...")
+            except Exception as verify_error:
+                print(f"⚠️ Warning: Could not verify row addition: {verify_error}")
+        return True
+    except APIError as e:
         # Handle API errors (quota exceeded, sheet full, etc.)
         print(f"⚠️ Failed to log to Google Sheets (API Error): {e}")
         print(f"   Error details: {str(e)}")
@@ -115,3 +154,4 @@ def log_pitch(query: dict, pitch: str, status: str = "Sent"):
         import traceback
         print(f"   Traceback: {traceback.format_exc()}")
         print("   Pitch was still sent successfully. Continuing...")
+    return False
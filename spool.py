@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from storage import connect
+
+SPOOL_PATH = os.getenv("HARO_SPOOL_PATH", "haro_spool.db")
+
+# Entries that are fully sent and logged are pruned after this many days
+SPOOL_RETENTION_DAYS = int(os.getenv("HARO_SPOOL_RETENTION_DAYS", "30"))
+
+# Queries deferred by the run budget are given up after this many hours
+# (queries with a deadline are dropped by the scheduler once it passes)
+DEFERRED_RETENTION_HOURS = float(os.getenv("HARO_DEFERRED_RETENTION_HOURS", "24"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pitches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    email_id TEXT,
+    reply_to TEXT,
+    query_json TEXT NOT NULL,
+    pitch TEXT NOT NULL,
+    send_status TEXT NOT NULL DEFAULT 'pending',
+    send_id TEXT,
+    log_row TEXT,
+    log_status TEXT NOT NULL DEFAULT 'none',
+    message_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pitches_log_status ON pitches (log_status);
+CREATE TABLE IF NOT EXISTS deferred_queries (
+    key TEXT PRIMARY KEY,
+    deferred_at TEXT NOT NULL,
+    email_json TEXT NOT NULL,
+    query_json TEXT NOT NULL
+);
+"""
+
+# Datetime fields of digests and queries, stored as ISO strings
+_DATETIME_FIELDS = ("timestamp", "deadline_at")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _load_datetimes(record: dict) -> dict:
+    for field in _DATETIME_FIELDS:
+        if isinstance(record.get(field), str):
+            record[field] = datetime.fromisoformat(record[field])
+    return record
+
+
+class Spool:
+    """
+    Local write-ahead log for the send/log path.
+
+    Every generated pitch is recorded before it is sent, its send result
+    right after, and its Sheets row before any Sheets call. Sheets rows are
+    then written in bulk by drain_log_rows(), on this run or a later one,
+    so a Sheets outage never loses audit data.
+
+    send_status: pending -> sent | failed
+    log_status:  none -> pending -> logged
+
+    A pending entry that holds its Gmail message was sent in a batch that
+    failed in transit; a later run checks whether it arrived and settles it.
+
+    Queries the run budget left for later are kept in deferred_queries
+    until a later run handles them.
+    """
+
+    def __init__(self, path: str = SPOOL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pitches)")}
+        if "message_json" not in columns:
+            # Spools created before unconfirmed sends were kept
+            with self._conn:
+                self._conn.execute("ALTER TABLE pitches ADD COLUMN message_json TEXT")
+
+    def record_pitch(self, query: dict, pitch: str, email_id: str | None = None) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO pitches (created_at, email_id, reply_to, query_json, pitch) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (_now(), email_id, query.get("reply_to"),
+                 json.dumps(query, default=str), pitch),
+            )
+            return cur.lastrowid
+
+    def record_send(self, entry_id: int, send_id: str | None):
+        status = "sent" if send_id else "failed"
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pitches SET send_status = ?, send_id = ?, message_json = NULL WHERE id = ?",
+                (status, send_id, entry_id),
+            )
+
+    def record_unconfirmed(self, entry_id: int, message: dict):
+        """
+        Keep the Gmail message of a send whose outcome is unknown; the entry
+        stays pending until settled with record_send.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pitches SET message_json = ? WHERE id = ?",
+                (json.dumps(message), entry_id),
+            )
+
+    def unconfirmed_sends(self) -> list[tuple[int, dict, str, dict]]:
+        """
+        (entry id, query, pitch, Gmail message) of every unconfirmed send.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, query_json, pitch, message_json FROM pitches "
+                "WHERE send_status = 'pending' AND message_json IS NOT NULL ORDER BY id"
+            ).fetchall()
+        return [(entry_id, json.loads(q), pitch, json.loads(message))
+                for entry_id, q, pitch, message in rows]
+
+    def queue_log_row(self, entry_id: int, row: list):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pitches SET log_row = ?, log_status = 'pending' WHERE id = ?",
+                (json.dumps(row), entry_id),
+            )
+
+    def pending_log_rows(self, limit: int | None = None) -> list[tuple[int, list]]:
+        sql = "SELECT id, log_row FROM pitches WHERE log_status = 'pending' ORDER BY id"
+        params = ()
+        if limit:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            return [(entry_id, json.loads(row))
+                    for entry_id, row in self._conn.execute(sql, params)]
+
+    def mark_logged(self, entry_ids: list[int]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE pitches SET log_status = 'logged' WHERE id = ?",
+                [(i,) for i in entry_ids],
+            )
+
+    def drain_log_rows(self, write_rows, batch_size: int = 500) -> int:
+        """
+        Write pending Sheets rows with `write_rows(rows) -> bool`, oldest
+        first, `batch_size` rows per call. Stops at the first failed write
+        and leaves the rest pending. Returns the number of rows written.
+        """
+        written = 0
+        while True:
+            pending = self.pending_log_rows(limit=batch_size)
+            if not pending:
+                break
+            if not write_rows([row for _, row in pending]):
+                print(f"⚠️ {len(self.pending_log_rows())} pitch log row(s) left in the spool for the next run.")
+                break
+            self.mark_logged([entry_id for entry_id, _ in pending])
+            written += len(pending)
+        self.prune()
+        return written
+
+    def defer_queries(self, items: list[tuple[str, dict, dict]]):
+        """
+        Keep (key, email, query) items for a later run. The digest body is
+        not stored; replying only needs its headers.
+        """
+        rows = [(key, _now(), json.dumps({k: v for k, v in email.items() if k != "body"}, default=str),
+                 json.dumps(q, default=str)) for key, email, q in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO deferred_queries (key, deferred_at, email_json, query_json) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "email_json = excluded.email_json, query_json = excluded.query_json",
+                rows,
+            )
+
+    def deferred_queries(self, retention_hours: float = DEFERRED_RETENTION_HOURS) -> list[tuple[dict, dict]]:
+        """
+        (email, query) pairs deferred by earlier runs, oldest first. Entries
+        older than `retention_hours` are dropped.
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=retention_hours)).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM deferred_queries WHERE deferred_at < ?", (cutoff,))
+            rows = self._conn.execute(
+                "SELECT email_json, query_json FROM deferred_queries ORDER BY deferred_at, key"
+            ).fetchall()
+        return [(_load_datetimes(json.loads(email)), _load_datetimes(json.loads(q))) for email, q in rows]
+
+    def forget_deferred(self, keys: list[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM deferred_queries WHERE key = ?", [(k,) for k in keys])
+
+    def prune(self, retention_days: int = SPOOL_RETENTION_DAYS):
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM pitches WHERE log_status = 'logged' AND send_status != 'pending' "
+                "AND created_at < ?",
+                (cutoff,),
+            )
+
+
+_spool = None
+
+
+def get_spool() -> Spool:
+    """
+    Return the process-wide spool, opening it on first use.
+    """
+    global _spool
+    if _spool is None:
+        _spool = Spool()
+    return _spool
@@ -0,0 +1,14 @@
+import sqlite3
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a local SQLite store for durable run state. WAL with synchronous=FULL
+    means every committed write is on disk before the call returns.
+    `check_same_thread=False` lets pitch worker threads share the connection;
+    callers serialize access with their own lock.
+    """
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    return conn
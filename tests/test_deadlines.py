@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+from haro_parser import extract_queries, parse_deadline
+
+# A digest received at 10:00 Eastern (EDT) on 20 May 2025
+RECEIVED = datetime(2025, 5, 20, 14, 0, tzinfo=timezone.utc)
+
+
+def test_time_zone_and_day_month():
+    assert parse_deadline("7:00 PM EST - 21 May", RECEIVED) == datetime(2025, 5, 21, 23, 0, tzinfo=timezone.utc)
+
+
+def test_month_day_with_ordinal_and_pacific_time():
+    assert parse_deadline("May 22nd, 5PM PT", RECEIVED) == datetime(2025, 5, 23, 0, 0, tzinfo=timezone.utc)
+
+
+def test_utc_deadline():
+    assert parse_deadline("21 May 2025 9:30 am GMT", RECEIVED) == datetime(2025, 5, 21, 9, 30, tzinfo=timezone.utc)
+
+
+def test_missing_time_means_end_of_day_eastern():
+    assert parse_deadline("5/21", RECEIVED) == datetime(2025, 5, 22, 3, 59, tzinfo=timezone.utc)
+
+
+def test_time_only_is_the_next_occurrence():
+    # 9 AM Eastern has already passed on the receive day
+    assert parse_deadline("9:00 AM ET", RECEIVED) == datetime(2025, 5, 21, 13, 0, tzinfo=timezone.utc)
+    assert parse_deadline("6 pm", RECEIVED) == datetime(2025, 5, 20, 22, 0, tzinfo=timezone.utc)
+
+
+def test_early_date_in_late_december_digest_is_next_year():
+    received = datetime(2025, 12, 30, 15, 0, tzinfo=timezone.utc)
+    assert parse_deadline("5 Jan", received).year == 2026
+
+
+def test_unparseable_deadlines():
+    assert parse_deadline("", RECEIVED) is None
+    assert parse_deadline("ASAP", RECEIVED) is None
+    assert parse_deadline("31 Feb", RECEIVED) is None
+
+
+def test_queries_carry_their_deadline():
+    digest = "\n".join([
+        "1) Summary: Solar savings for homeowners",
+        "Name: Jane Doe",
+        "Category: Energy",
+        "Email: query-1@helpareporter.net",
+        "Media Outlet: Example News",
+        "Deadline: 7:00 PM EST - 21 May",
+        "Query:",
+        "How can homeowners cut energy bills with solar?",
+    ])
+    [query] = extract_queries(digest, RECEIVED)
+    assert query["reply_to"] == "query-1@helpareporter.net"
+    assert query["deadline_at"] == datetime(2025, 5, 21, 23, 0, tzinfo=timezone.utc)
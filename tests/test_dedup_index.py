@@ -0,0 +1,92 @@
+import pytest
+
+import dedup_index
+from dedup_index import DedupIndex
+from haro_parser import query_fingerprint
+from profiles import DEFAULT_PROFILE, dedup_key
+
+DAY = 86400
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dedup_index.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def index(tmp_path, clock):
+    return DedupIndex(str(tmp_path / "dedup.db"), ttl_seconds=30 * DAY)
+
+
+def test_added_fingerprint_is_contained(index):
+    assert "a:1" not in index
+    index.add("a:1")
+    assert "a:1" in index
+    assert "a:2" not in index
+
+
+def test_entries_expire_after_ttl(index, clock):
+    index.add("a:1")
+    clock.now += 30 * DAY - 1
+    assert "a:1" in index
+    clock.now += 2
+    assert "a:1" not in index
+
+
+def test_evict_expired_deletes_only_old_entries(index, clock):
+    index.add("old")
+    clock.now += 20 * DAY
+    index.add("new")
+    clock.now += 11 * DAY
+    assert index.evict_expired() == 1
+    assert "new" in index
+    assert index.evict_expired() == 0
+
+
+def test_expired_entries_are_evicted_on_open(tmp_path, clock):
+    path = str(tmp_path / "dedup.db")
+    DedupIndex(path, ttl_seconds=DAY).add("a:1")
+    clock.now += 2 * DAY
+    reopened = DedupIndex(path, ttl_seconds=DAY)
+    assert reopened.evict_expired() == 0
+    assert "a:1" not in reopened
+
+
+def test_readding_after_expiry_restarts_ttl(index, clock):
+    index.add("a:1")
+    clock.now += 31 * DAY
+    assert "a:1" not in index
+    index.add("a:1")
+    clock.now += 29 * DAY
+    assert "a:1" in index
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "dedup.db")
+    DedupIndex(path).add("a:1")
+    assert "a:1" in DedupIndex(path)
+
+
+def test_dedup_key_is_scoped_to_profile():
+    query = {"query": "Looking for sleep experts", "reply_to": "Query-1@helpareporter.net"}
+    fingerprint = query_fingerprint(query)
+    assert dedup_key(query) == fingerprint
+    assert dedup_key({**query, "profile": DEFAULT_PROFILE}) == fingerprint
+    assert dedup_key({**query, "profile": "other-brand"}) == f"other-brand|{fingerprint}"
+
+
+def test_fingerprint_ignores_case_punctuation_and_spacing():
+    a = {"query": "Looking for  sleep experts!", "reply_to": "Query-1@helpareporter.net"}
+    b = {"query": "looking for sleep experts", "reply_to": "query-1@helpareporter.net"}
+    assert query_fingerprint(a) == query_fingerprint(b)
+    assert query_fingerprint(a) != query_fingerprint({**b, "reply_to": "query-2@helpareporter.net"})
@@ -0,0 +1,45 @@
+from haro_parser import extract_queries, iter_queries
+
+DIGEST = """\
+1) Summary: Solar savings for homeowners
+Name: Jane Doe
+Category: Energy
+Email: query-1@helpareporter.net
+Media Outlet: Example News
+Deadline: 7:00 PM EST - 21 May
+Query:
+How can homeowners cut energy bills with solar?
+Requirements:
+Experts only.
+Back to Top Back to Category Index
+-----------------------------------
+2) Summary: Budgeting apps
+Name: John Roe
+Category: Business and Finance
+Email: query-2@helpareporter.net
+Media Outlet: Money Weekly
+Deadline: 5 PM ET - 22 May
+Query:
+Which budgeting app features matter most?
+Back to Top
+"""
+
+
+def test_navigation_footer_is_not_part_of_requirements():
+    first, second = extract_queries(DIGEST)
+    assert first["requirements"] == "Experts only."
+    assert first["query"] == "How can homeowners cut energy bills with solar?"
+    assert second["query"] == "Which budgeting app features matter most?"
+    assert second["requirements"] == ""
+
+
+def test_fields_of_each_block():
+    first, second = extract_queries(DIGEST)
+    assert (first["title"], first["publication"], first["reply_to"]) == (
+        "Solar savings for homeowners", "Energy", "query-1@helpareporter.net")
+    assert (second["name"], second["media_outlet"]) == ("John Roe", "Money Weekly")
+
+
+def test_streams_lines():
+    titles = [q["title"] for q in iter_queries(iter(DIGEST.splitlines()))]
+    assert titles == ["Solar savings for homeowners", "Budgeting apps"]
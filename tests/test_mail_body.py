@@ -0,0 +1,118 @@
+import base64
+
+from gmail_client import _parse_message
+from mail_body import html_to_text, message_text, parse_raw, payload_text
+
+PLAIN = "Summary: Looking for sleep experts\nName: Jane Doe\nEmail: query-1@helpareporter.net\n" * 5
+HTML = ("<html><head><style>p {color: red}</style></head><body>"
+        "<p>Summary: Looking for <b>sleep</b> experts</p>"
+        "<p>Email: <a href=\"mailto:query-1@helpareporter.net\">Reply here</a></p>"
+        + "<div>filler</div>" * 200 + "</body></html>")
+
+
+def _b64(text: str, charset: str = "utf-8") -> str:
+    return base64.urlsafe_b64encode(text.encode(charset)).decode()
+
+
+def _part(mime_type, text=None, charset="utf-8", **extra):
+    part = {"mimeType": mime_type,
+            "headers": [{"name": "Content-Type", "value": f'{mime_type}; charset="{charset}"'}],
+            "body": {}}
+    if text is not None:
+        data = _b64(text, "utf-8" if charset.startswith("x-") else charset)
+        part["body"] = {"data": data, "size": len(data)}
+    part.update(extra)
+    return part
+
+
+def _raw(source: str) -> str:
+    return base64.urlsafe_b64encode(source.replace("\n", "\r\n").encode()).decode()
+
+
+def test_nested_alternative_inside_mixed():
+    payload = {"mimeType": "multipart/mixed", "parts": [
+        {"mimeType": "multipart/alternative", "parts": [_part("text/plain", PLAIN),
+                                                        _part("text/html", HTML)]},
+        _part("text/plain", "attached notes " * 100, filename="notes.txt"),
+    ]}
+    assert payload_text(payload) == (PLAIN, "text/plain")
+
+
+def test_html_only_digest():
+    payload = {"mimeType": "multipart/alternative", "parts": [_part("text/html", HTML)]}
+    text, mime_type = payload_text(payload)
+    assert mime_type == "text/html"
+    assert "Summary: Looking for sleep experts" in text
+    assert "color: red" not in text and "<" not in text
+
+
+def test_stub_plain_part_falls_back_to_html():
+    payload = {"mimeType": "multipart/alternative", "parts": [
+        _part("text/plain", "View this email in your browser."), _part("text/html", HTML)]}
+    text, mime_type = payload_text(payload)
+    assert mime_type == "text/html"
+    assert "sleep experts" in text
+
+
+def test_attachment_id_body_is_fetched():
+    part = _part("text/plain")
+    part["body"] = {"attachmentId": "att-1", "size": 4096}
+    fetched = []
+
+    def fetch(attachment_id):
+        fetched.append(attachment_id)
+        return _b64(PLAIN)
+
+    assert payload_text({"mimeType": "text/plain", **part}, fetch) == (PLAIN, "text/plain")
+    assert fetched == ["att-1"]
+    assert payload_text({"mimeType": "text/plain", **part}) == ("", "text/plain")
+
+
+def test_charset_is_honoured():
+    payload = _part("text/plain", "Café owners wanted", charset="iso-8859-1")
+    assert payload_text(payload) == ("Café owners wanted", "text/plain")
+
+
+def test_unknown_charset_full_format():
+    payload = _part("text/plain", "Looking for experts", charset="x-unknown-cs")
+    assert payload_text(payload) == ("Looking for experts", "text/plain")
+
+
+def test_unknown_charset_raw_format():
+    message = parse_raw(_raw(
+        "Subject: HARO digest\nMessage-ID: <d1@example.com>\n"
+        'Content-Type: text/plain; charset="x-unknown-cs"\n\nLooking for experts\n'))
+    assert message_text(message) == ("Looking for experts\r\n", "text/plain")
+
+
+def test_raw_nested_alternative_inside_mixed():
+    message = parse_raw(_raw(
+        "Subject: HARO digest\nMIME-Version: 1.0\n"
+        'Content-Type: multipart/mixed; boundary="outer"\n\n'
+        "--outer\n"
+        'Content-Type: multipart/alternative; boundary="inner"\n\n'
+        "--inner\nContent-Type: text/plain; charset=utf-8\n\nView online.\n"
+        f"--inner\nContent-Type: text/html; charset=utf-8\n\n{HTML}\n"
+        "--inner--\n"
+        "--outer\nContent-Type: text/plain\nContent-Disposition: attachment; filename=a.txt\n\n"
+        + "attached " * 500 + "\n--outer--\n"))
+    text, mime_type = message_text(message)
+    assert mime_type == "text/html"
+    assert "sleep experts" in text and "attached" not in text
+
+
+def test_html_to_text_keeps_mailto_address():
+    text = html_to_text('<p>Email: <a href="mailto:query-1@helpareporter.net?subject=x">Reply</a></p>')
+    assert text == "Email: Reply (query-1@helpareporter.net)"
+    shown = html_to_text('<a href="mailto:a@b.net">a@b.net</a>')
+    assert shown == "a@b.net"
+
+
+def test_parse_message_raw_with_unknown_charset():
+    detail = {"id": "m1", "threadId": "t1", "internalDate": "1716213600000", "raw": _raw(
+        "Subject: HARO digest\nMessage-ID: <d1@example.com>\n"
+        'Content-Type: text/plain; charset="x-unknown-cs"\n\nLooking for experts\n')}
+    email = _parse_message(detail)
+    assert email["subject"] == "HARO digest"
+    assert email["message_id"] == "<d1@example.com>"
+    assert email["body"].strip() == "Looking for experts"
@@ -0,0 +1,155 @@
+import pytest
+
+import model_router
+from model_router import CircuitBreaker, ModelRouter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_router.time, "monotonic", clock)
+    return clock
+
+
+def test_circuit_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_one_trial_after_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+    breaker.record_failure()
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_failed_trial_restarts_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now += 60
+    assert breaker.allow()
+
+
+class Completions:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, model, messages, timeout, **kwargs):
+        self.calls.append(model)
+        if model in self.failing:
+            raise TimeoutError(f"{model} timed out")
+        return f"{model}: {messages}"
+
+
+def _router(complete_fn, threshold=2):
+    return ModelRouter("primary", "fallback", complete_fn, hedge=False,
+                       breaker=CircuitBreaker(threshold, cooldown_seconds=60))
+
+
+def test_primary_answers(clock):
+    completions = Completions()
+    assert _router(completions).complete(lambda model: "hi") == "primary: hi"
+    assert completions.calls == ["primary"]
+
+
+def test_falls_back_on_primary_failure(clock):
+    completions = Completions(failing={"primary"})
+    assert _router(completions).complete(lambda model: "hi") == "fallback: hi"
+    assert completions.calls == ["primary", "fallback"]
+
+
+def test_skips_primary_while_circuit_open(clock):
+    completions = Completions(failing={"primary"})
+    router = _router(completions, threshold=2)
+    for _ in range(2):
+        router.complete(lambda model: "hi")
+    completions.calls.clear()
+    assert router.complete(lambda model: "hi") == "fallback: hi"
+    assert completions.calls == ["fallback"]
+
+    completions.failing.clear()
+    clock.now += 60
+    assert router.complete(lambda model: "hi") == "primary: hi"
+
+
+def test_fallback_failure_is_raised(clock):
+    router = _router(Completions(failing={"primary", "fallback"}))
+    with pytest.raises(TimeoutError):
+        router.complete(lambda model: "hi")
+
+
+def test_breaker_state_survives_restart(clock, monkeypatch):
+    monkeypatch.setattr(model_router.time, "time", lambda: clock.now + 5000)
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+    breaker.record_failure()
+    clock.now += 30
+    state = breaker.to_dict()
+
+    restored = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+    restored.restore(state)
+    assert not restored.allow()
+    clock.now += 30
+    assert restored.allow()
+    assert not restored.allow()
+
+
+def test_router_state_is_saved_and_loaded(tmp_path, clock):
+    path = str(tmp_path / "router.json")
+    completions = Completions(failing={"primary"})
+    router = ModelRouter("primary", "fallback", completions, hedge=False, state_path=path,
+                         breaker=CircuitBreaker(2, cooldown_seconds=60))
+    router.latency.restore([0.5, 0.7])
+    for _ in range(2):
+        router.complete(lambda model: "hi")
+    router.save_state()
+
+    completions.calls.clear()
+    reloaded = ModelRouter("primary", "fallback", completions, hedge=False, state_path=path,
+                           breaker=CircuitBreaker(2, cooldown_seconds=60))
+    assert reloaded.latency.samples() == [0.5, 0.7]
+    assert reloaded.complete(lambda model: "hi") == "fallback: hi"
+    assert completions.calls == ["fallback"]
+
+
+def test_unused_router_does_not_write_state(tmp_path):
+    path = tmp_path / "router.json"
+    ModelRouter("primary", "fallback", Completions(), state_path=str(path)).save_state()
+    assert not path.exists()
+
+
+def test_unreadable_state_is_ignored(tmp_path):
+    path = tmp_path / "router.json"
+    path.write_text("{not json")
+    router = ModelRouter("primary", "fallback", Completions(), hedge=False, state_path=str(path))
+    assert router.complete(lambda model: "hi") == "primary: hi"
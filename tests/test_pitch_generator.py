@@ -0,0 +1,59 @@
+import pytest
+
+import pitch_generator
+from pitch_generator import _draft_pitch, _response
+
+PERSONA = {"name": "Jane Doe", "title": "Energy Consultant", "website": "https://example.com"}
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    """
+    Queue of (content, finish_reason) replies; records each call's messages.
+    """
+    queue, calls = [], []
+
+    def complete(build_messages, max_tokens, **kwargs):
+        calls.append(build_messages(pitch_generator.PRIMARY_MODEL))
+        content, finish_reason = queue.pop(0)
+        return _response(pitch_generator.PRIMARY_MODEL, content, finish_reason)
+
+    monkeypatch.setattr(pitch_generator, "_complete_with_fallback", complete)
+    monkeypatch.setattr(pitch_generator, "STREAM_PITCHES", False)
+    return queue, calls
+
+
+def _build(model):
+    return [{"role": "user", "content": "Query"}]
+
+
+def test_cut_off_draft_is_continued_with_a_space(replies):
+    queue, calls = replies
+    queue.extend([
+        ("The quickest win is to cut your ", "length"),
+        ("electricity use at peak hours.\n\nJane Doe\nEnergy Consultant\nhttps://example.com\n", "stop"),
+    ])
+    pitch = _draft_pitch(_build, PERSONA)
+    assert pitch.startswith("The quickest win is to cut your electricity use at peak hours.")
+    assert pitch.endswith("https://example.com")
+    assert len(calls) == 2
+    assert calls[1][-2] == {"role": "assistant", "content": "The quickest win is to cut your"}
+    assert calls[1][-1]["content"] == pitch_generator.CONTINUE_PROMPT
+
+
+def test_continuation_keeps_its_own_line_break(replies):
+    queue, _ = replies
+    queue.extend([
+        ("Shift laundry to off-peak hours.", "length"),
+        ("\n\nJane Doe\nEnergy Consultant\nhttps://example.com", "stop"),
+    ])
+    assert _draft_pitch(_build, PERSONA) == (
+        "Shift laundry to off-peak hours.\n\nJane Doe\nEnergy Consultant\nhttps://example.com")
+
+
+def test_finished_draft_is_not_continued(replies):
+    queue, calls = replies
+    queue.append(("Shift laundry to off-peak hours.\n\nJane Doe\nEnergy Consultant\n"
+                  "https://example.com\nP.S. thanks", "stop"))
+    assert _draft_pitch(_build, PERSONA).endswith("https://example.com")
+    assert len(calls) == 1
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+from scheduler import DEADLINE_MARGIN_MINUTES, schedule_queries
+
+NOW = datetime(2025, 5, 20, 14, 0, tzinfo=timezone.utc)
+
+
+def _query(title, hours=None, score=1.0):
+    return {"title": title, "relevance_score": score,
+            "deadline_at": NOW + timedelta(hours=hours) if hours is not None else None}
+
+
+def _titles(queries):
+    return [q["title"] for q in queries]
+
+
+def test_earliest_deadline_first_and_undated_last():
+    queries = [_query("undated"), _query("tomorrow", 24), _query("tonight", 6), _query("soon", 1)]
+    scheduled, deferred = schedule_queries(queries, now=NOW, budget=0)
+    assert _titles(scheduled) == ["soon", "tonight", "tomorrow", "undated"]
+    assert deferred == []
+
+
+def test_ties_broken_by_relevance_score():
+    queries = [_query("weak", 6, 1.0), _query("strong", 6, 3.0), _query("undated weak", score=1.5),
+               _query("undated strong", score=2.5)]
+    scheduled, _ = schedule_queries(queries, now=NOW, budget=0)
+    assert _titles(scheduled) == ["strong", "weak", "undated strong", "undated weak"]
+
+
+def test_expired_queries_are_dropped():
+    almost = _query("inside margin")
+    almost["deadline_at"] = NOW + timedelta(minutes=DEADLINE_MARGIN_MINUTES - 1)
+    queries = [_query("past", -1), almost, _query("later", 2)]
+    scheduled, deferred = schedule_queries(queries, now=NOW, budget=0)
+    assert _titles(scheduled) == ["later"]
+    assert deferred == []
+
+
+def test_budget_defers_the_least_urgent():
+    queries = [_query("c", 3), _query("undated"), _query("a", 1), _query("b", 2)]
+    scheduled, deferred = schedule_queries(queries, now=NOW, budget=2)
+    assert _titles(scheduled) == ["a", "b"]
+    assert _titles(deferred) == ["c", "undated"]
+
+
+def test_wrapped_items():
+    items = [("digest-1", _query("later", 5)), ("digest-2", _query("sooner", 1))]
+    scheduled, _ = schedule_queries(items, query_of=lambda item: item[1], now=NOW, budget=0)
+    assert [digest for digest, _ in scheduled] == ["digest-2", "digest-1"]